@@ -1,16 +1,21 @@
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import FrozenSet, List, Optional, Tuple
 
 
-@dataclass
+def tile_key(tx: int, ty: int) -> int:
+    # pack tile coords into one int so lookups hash a single int, not a tuple
+    return (tx << 20) | (ty & 0xFFFFF)
+
+
+@dataclass(slots=True)
 class Observation:
     player_pos: Tuple[float, float]
-    nearby_tiles: List[Tuple[int, int]]
+    nearby_tiles: FrozenSet[int]  # tile_key(tx, ty) of active tiles
     nearby_items: List[object]
     nearby_npcs: List[object]
 
 
-@dataclass
+@dataclass(slots=True)
 class Action:
     move_left: bool = False
     move_right: bool = False
@@ -20,7 +25,7 @@ class Action:
     direction: int = 1
 
 
-@dataclass
+@dataclass(slots=True)
 class ExplorationConfig:
     prefer_right: bool = True
     jump_if_blocked: bool = True
@@ -34,15 +39,14 @@ class ExplorationBot:
         # Minimal tile-aware policy:
         # move in the preferred direction, jump if a solid tile blocks the body.
         direction = 1 if self.config.prefer_right else -1
-        tiles = set()
-        for t in obs.nearby_tiles:
-            if isinstance(t, dict):
-                tx = t.get("x")
-                ty = t.get("y")
-                if tx is not None and ty is not None:
-                    tiles.add((tx, ty))
-            elif isinstance(t, (list, tuple)) and len(t) >= 2:
-                tiles.add((t[0], t[1]))
+        tiles = obs.nearby_tiles
+        if not tiles:
+            # nothing around us can block; skip the collision probe
+            return Action(
+                move_right=direction > 0,
+                move_left=direction < 0,
+                direction=direction,
+            )
         px, py = obs.player_pos
 
         player_width = 20
@@ -55,7 +59,7 @@ class ExplorationBot:
         ty_mid = int(mid_y // 16)
         ty_foot = int(foot_y // 16)
 
-        blocked = (tx, ty_mid) in tiles or (tx, ty_foot) in tiles
+        blocked = tile_key(tx, ty_mid) in tiles or tile_key(tx, ty_foot) in tiles
 
         action = Action(
             move_right=direction > 0,
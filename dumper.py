@@ -1,126 +1,261 @@
 # proxy.py
 import io
-import asyncio, binascii, datetime, sys
+import asyncio, datetime, struct, sys
 
 import construct
 
-from terraria_construct import payload_structs
+try:
+    import uvloop
+except ImportError:  # optional: fall back to the default asyncio loop
+    uvloop = None
+
+from terraria_construct import fast_payload_parsers, parse_message, payload_structs
 
 UP_HOST, UP_PORT = "127.0.0.1", 7778  # 실제 서버
 LISTEN_HOST, LISTEN_PORT = "127.0.0.1", 7777  # 클라이언트가 접속할 포트
+COMPACT_THRESHOLD = 65536  # read_pos가 이 값을 넘으면 버퍼 앞부분을 정리
+RECV_SIZE = 65536  # recv_into 한 번에 확보해 두는 최소 빈 공간
+WRITE_HIGH_WATER = 1 << 20  # 전달 소켓 송신 버퍼 high-water mark
+DEBUG = False  # 프레이밍(length/need) 진단 출력
+CHECK_LEFTOVERS = False  # 파서가 페이로드를 다 읽지 못했을 때 경고 (파싱 오류 조사용)
+_LEN_UNPACK = struct.Struct("<H").unpack_from
 
 construct.setGlobalPrintFullStrings(True)
 # construct.setGlobalPrintLimit(0)
 
 
-def read_7bit_int(stream: io.BytesIO) -> int:
+def read_7bit_int(buf, off: int) -> tuple[int, int]:
+    """buf[off:]에서 7-bit int를 읽어 (값, 다음 오프셋) 반환"""
     result = 0
     shift = 0
     while True:
-        b = stream.read(1)
-        if not b:
+        if off >= len(buf):
             raise EOFError("unexpected EOF while reading 7-bit int")
-        byte = b[0]
+        byte = buf[off]
+        off += 1
         result |= (byte & 0x7F) << shift
         if (byte & 0x80) == 0:
-            return result
+            return result, off
         shift += 7
         if shift > 35:
             raise ValueError("7-bit int too large")
 
 
-def read_dotnet_string(stream: io.BytesIO) -> str:
-    length = read_7bit_int(stream)
-    data = stream.read(length)
-    return data.decode("utf-8", errors="replace")
+def read_dotnet_string(buf, off: int) -> tuple[str, int]:
+    length, off = read_7bit_int(buf, off)
+    data = bytes(buf[off : off + length])
+    return data.decode("utf-8", errors="replace"), off + length
+
+
+def _stream_parser(st):
+    parse_stream = st.parse_stream
+
+    def parse(payload):
+        stream = io.BytesIO(payload)
+        return parse_stream(stream), stream.tell()
+
+    return parse
 
 
 class PacketDumper:
-    def __init__(self, prefix):
+    # 로그 가치가 없는 타입 (0x05는 로그인 때 수백 번 옴): 파싱/출력 모두 생략
+    SKIP_TYPES = frozenset({0x05})
+
+    def __init__(self, prefix, skip_types=None):
         self.prefix = prefix
+        self.skip_types = (
+            self.SKIP_TYPES if skip_types is None else frozenset(skip_types)
+        )
         self.buf = bytearray()
+        # 처리 완료된 바이트 위치. 패킷마다 del 하지 않고 커서만 전진시킨다.
+        self.read_pos = 0
+        # buf 중 실제로 수신된 데이터의 끝 (그 뒤는 recv_into용 빈 공간)
+        self.write_pos = 0
+        # msg_type으로 바로 인덱싱하는 256칸 파서 테이블 (해시 조회 없음)
+        # 각 파서는 (parsed, 소비한 바이트 수)를 반환: 자주 오는 메시지는 struct
+        # 기반 fast path, 나머지는 construct
+        self._parse_tbl = [None] * 256
+        for t, st in payload_structs.items():
+            self._parse_tbl[t] = fast_payload_parsers.get(t) or _stream_parser(st)
+
+    def _compact(self):
+        if self.read_pos > COMPACT_THRESHOLD or self.read_pos > self.write_pos // 2:
+            del self.buf[: self.read_pos]
+            self.write_pos -= self.read_pos
+            self.read_pos = 0
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """소켓이 바로 써넣을 수 있도록 buf 끝의 빈 공간을 memoryview로 반환"""
+        self._compact()
+        need = max(sizehint, RECV_SIZE)
+        free = len(self.buf) - self.write_pos
+        if free < need:
+            self.buf.extend(bytes(need - free))
+        return memoryview(self.buf)[self.write_pos :]
+
+    def buffer_updated(self, nbytes: int, parse: bool = True):
+        self.write_pos += nbytes
+        if parse:
+            self.parse_available()
 
     def feed(self, data: bytes):
         """데이터를 누적하고 완성된 패킷 단위로 로그 출력"""
-        self.buf.extend(data)
+        n = len(data)
+        with self.get_buffer(n) as view:
+            view[:n] = data
+        self.buffer_updated(n)
+
+    def parse_available(self):
+        skip_types = self.skip_types
         while True:
+            pos = self.read_pos
+            avail = self.write_pos - pos
             # 최소 길이(2바이트 length)는 있어야 함
-            if len(self.buf) < 2:
+            if avail < 2:
                 return
-            length = int.from_bytes(self.buf[:2], "little")
+            length = _LEN_UNPACK(self.buf, pos)[0]
             need = length
-            print(f"{length=}{need=}")
-            if len(self.buf) < need:
+            if DEBUG:
+                print(f"{length=}{need=}")
+            if avail < need:
                 return  # 아직 덜 들어옴
 
-            packet = bytes(self.buf[:length])
-            del self.buf[:length]
-
-            msg_type = packet[2]
-            payload = packet[3:]
-
-            assert len(payload) == length - 3
-
-            parsed = None
-            if msg_type in payload_structs:
-                try:
-                    stream = io.BytesIO(payload)
-                    parsed = payload_structs[msg_type].parse_stream(stream)
-                    if stream.tell() != len(payload):
-                        print(f"!! leftover {len(payload)-stream.tell()} bytes")
-                        print(f"raw: {binascii.hexlify(stream.getvalue()).decode()}")
-
-                    # NetModules (0x52) - decode NetTextModule (id=1)
-                    if msg_type == 0x52 and hasattr(parsed, "module_id"):
-                        module_id = parsed.module_id
-                        if module_id == 1:
-                            try:
-                                mstream = io.BytesIO(parsed.module_payload)
-                                command = read_dotnet_string(mstream)
-                                text = read_dotnet_string(mstream)
-                                parsed = {
-                                    "module_id": module_id,
-                                    "module": "NetTextModule",
-                                    "command": command,
-                                    "text": text,
-                                }
-                            except Exception as e:
-                                parsed = f"<nettext parse error: {e}>"
-                except Exception as e:
-                    parsed = f"<parse error: {e}>"
-            else:
-                parsed = f'<unknown type: {msg_type}>; "{payload}"'
-
-            ts = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            if msg_type != 0x05:
-                print(f"[{ts}] {self.prefix} type=0x{msg_type:02X} len={length}")
-                print(f"raw: {binascii.hexlify(packet).decode()} ({len(packet)} bytes)")
-                if parsed is not None:
-                    print(f"parsed: {parsed}")
-                print(flush=True)
-
-
-async def pipe(reader, writer, prefix):
-    dumper = PacketDumper(prefix)
-    while True:
-        chunk = await reader.read(65536)
-        if not chunk:
-            writer.close()
-            await writer.wait_closed()
-            break
-        dumper.feed(chunk)
-        writer.write(chunk)
-        await writer.drain()
+            self.read_pos = pos + length
+            msg_type = self.buf[pos + 2]
+            if msg_type in skip_types:
+                continue
+
+            # 패킷을 bytes로 복사하지 않고 buf 위의 memoryview로 파싱/출력한다.
+            # 블록을 벗어나면 view들을 명시적으로 해제해 이후 buf 리사이즈를 막지 않게 함
+            with memoryview(self.buf) as view:
+                with view[pos : pos + length] as packet, packet[3:] as payload:
+                    self._dump_packet(msg_type, length, packet, payload)
+
+    def _dump_packet(self, msg_type, length, packet, payload):
+        assert len(payload) == length - 3
+
+        parsed = None
+        parse = self._parse_tbl[msg_type]
+        if parse is not None:
+            try:
+                if CHECK_LEFTOVERS:
+                    # the per-type table also reports how much was consumed
+                    parsed, consumed = parse(payload)
+                    if consumed != len(payload):
+                        print(f"!! leftover {len(payload)-consumed} bytes")
+                        print(f"raw: {payload.hex()}")
+                else:
+                    _, parsed = parse_message(packet)
 
+                # NetModules (0x52) - decode NetTextModule (id=1)
+                if msg_type == 0x52:
+                    module_id = getattr(parsed, "module_id", None)
+                    if module_id == 1:
+                        try:
+                            mpayload = parsed.module_payload
+                            command, off = read_dotnet_string(mpayload, 0)
+                            text, off = read_dotnet_string(mpayload, off)
+                            parsed = {
+                                "module_id": module_id,
+                                "module": "NetTextModule",
+                                "command": command,
+                                "text": text,
+                            }
+                        except Exception as e:
+                            parsed = f"<nettext parse error: {e}>"
+            except Exception as e:
+                parsed = f"<parse error: {e}>"
+        else:
+            parsed = f'<unknown type: {msg_type}>; "{bytes(payload)}"'
 
-async def handle(client_r, client_w):
-    up_r, up_w = await asyncio.open_connection(UP_HOST, UP_PORT)
-    asyncio.create_task(pipe(client_r, up_w, "C→S"))
-    await pipe(up_r, client_w, "S→C")
+        ts = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        print(f"[{ts}] {self.prefix} type=0x{msg_type:02X} len={length}")
+        print(f"raw: {packet.hex()} ({len(packet)} bytes)")
+        if parsed is not None:
+            print(f"parsed: {parsed}")
+        print(flush=True)
+
+
+class ProxyProtocol(asyncio.BufferedProtocol):
+    """수신 데이터를 PacketDumper 버퍼에 바로 recv_into 하고 상대편 소켓으로 전달"""
+
+    def __init__(self, prefix, peer=None):
+        self.dumper = PacketDumper(prefix)
+        self.transport = None
+        self.peer = peer
+        if peer is not None:
+            peer.peer = self
+        self._loop = None
+        self._parse_pending = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._loop = asyncio.get_running_loop()
+        # 송신 버퍼가 이만큼 쌓였을 때만 상대편 읽기를 멈춤 (기본 64KB보다 여유 있게)
+        transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        if self.peer is None:
+            # 클라이언트 쪽 연결: 업스트림이 붙을 때까지 읽지 않는다
+            transport.pause_reading()
+            self._loop.create_task(connect_upstream(self))
+
+    def get_buffer(self, sizehint):
+        return self.dumper.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        start = self.dumper.write_pos
+        # 3.12+ 트랜스포트는 넘겨받은 memoryview를 복사 없이 보관할 수 있으므로
+        # 재사용되는 수신 버퍼 대신 bytes로 잘라서 넘긴다
+        self.peer.transport.write(
+            bytes(memoryview(self.dumper.buf)[start : start + nbytes])
+        )
+        # 로그용 파싱은 전달 경로에서 떼어내 다음 루프 턴에 모아서 처리한다
+        self.dumper.buffer_updated(nbytes, parse=False)
+        if not self._parse_pending:
+            self._parse_pending = True
+            self._loop.call_soon(self._parse)
+
+    def _parse(self):
+        self._parse_pending = False
+        self.dumper.parse_available()
+
+    def pause_writing(self):
+        # 이쪽 송신 버퍼가 찼으면 상대편에서 더 읽어오지 않는다 (drain 대체)
+        self.peer.transport.pause_reading()
+
+    def resume_writing(self):
+        self.peer.transport.resume_reading()
+
+    def eof_received(self):
+        if self.peer is not None:
+            self.peer.transport.close()
+
+    def connection_lost(self, exc):
+        if self.peer is not None and self.peer.transport is not None:
+            self.peer.transport.close()
+
+
+async def connect_upstream(client: ProxyProtocol):
+    loop = asyncio.get_running_loop()
+    try:
+        upstream, _ = await loop.create_connection(
+            lambda: ProxyProtocol("S→C", peer=client), UP_HOST, UP_PORT
+        )
+    except OSError as e:
+        print(f"upstream connect failed: {e}", flush=True)
+        client.transport.close()
+        return
+    if client.transport.is_closing():
+        # 클라이언트가 연결 도중 끊김: 새 업스트림도 바로 닫는다
+        upstream.close()
+        return
+    client.transport.resume_reading()
 
 
 async def main():
-    srv = await asyncio.start_server(handle, LISTEN_HOST, LISTEN_PORT)
+    loop = asyncio.get_running_loop()
+    srv = await loop.create_server(
+        lambda: ProxyProtocol("C→S"), LISTEN_HOST, LISTEN_PORT
+    )
     addrs = ", ".join(str(s.getsockname()) for s in srv.sockets)
     print(f"listening on {addrs}", flush=True)
     async with srv:
@@ -128,7 +263,9 @@ async def main():
 
 
 if __name__ == "__main__":
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
     try:
-        asyncio.run(main())
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(main())
     except KeyboardInterrupt:
         sys.exit(0)
@@ -3,22 +3,76 @@ import random
 import argparse
 import time
 import select
+import sys
 import zlib
 import binascii
 import json
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, is_dataclass
 from pathlib import Path
 from typing import Optional
 from types import SimpleNamespace
-from terraria_construct import payload_structs, TerrariaMessage
+from construct import Container
+from terraria_construct import parse_message, payload_structs
 from protocol import VersionSpec, resolve_spec
 from bot.exploration import (
     ExplorationBot,
     Observation,
     ExplorationConfig,
     Action,
+    tile_key,
 )
 
+try:
+    import numpy as np
+except ImportError:  # optional: vectorized tile grid writes
+    np = None
+try:
+    from numba import njit
+except ImportError:  # optional: JIT-compiled tile decoder (pure Python otherwise)
+    njit = None
+try:
+    import orjson
+except ImportError:  # optional: C JSON encoder for dump_state
+    orjson = None
+
 HOST, PORT = "127.0.0.1", 7777
+TILE_WORKERS = 2  # threads inflating 0x0A tile sections during world load
+PICKUP_RESCAN_PX = 16.0  # tick pickup scans rerun after the player moves this far
+STREAM_COMPACT_MIN = 16384  # consumed bytes PacketStream tolerates before compacting
+SEND_IOV_MAX = 1024  # most packets send_raw_batch hands to one sendmsg (Linux IOV_MAX)
+_LEN_UNPACK = struct.Struct("<H").unpack_from  # packet length prefix
+_MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)  # per-call non-blocking recv
+EMPTY_TILE = 0xFFFF  # WorldState.tiles sentinel for "no active tile"
+# precompiled packers for packets built every tick
+_HEADER_PACK = struct.Struct("<HB").pack  # length + msg_type
+_NETMOD_HEADER_PACK = struct.Struct("<HBH").pack  # length + 0x52 + module_id
+_COLOR_PACK = struct.Struct("<BBB").pack
+# fixed-shape packets packed whole (length + type + payload) in one call
+_CTRL_V0_PACKET = struct.Struct("<HBBBBffffB")
+_CTRL_V1_PACKET = struct.Struct("<HBBBBBBBff")
+_CTRL_V1_VEL_PACKET = struct.Struct("<HBBBBBBBffff")
+_SPAWN_V0_PACKET = struct.Struct("<HBBii")
+_SPAWN_V1_PACKET = struct.Struct("<HBBhhihhBB")
+_EQUIP_V0_PACKET = struct.Struct("<HBBhhBh")
+_EQUIP_V1_PACKET = struct.Struct("<HBBhhBhB")
+_SLOT_STAT_PACKET = struct.Struct("<HBBhh")  # $10 life / $2A mana
+_LOADOUT_PACKET = struct.Struct("<HB4B")
+_TELEPORT_ACK_PACKET = struct.Struct("<HBBhffB")
+_REMOVE_ITEM_PACKET = struct.Struct("<HBh")
+_I8 = struct.Struct("<b")
+_I16 = struct.Struct("<h")
+_U16 = struct.Struct("<H")
+_I32 = struct.Struct("<i")
+_F32 = struct.Struct("<f")
+_U16_UNPACK = _U16.unpack_from
+_I16_UNPACK = _I16.unpack_from
+_TELEPORT_HEAD = struct.Struct("<BhffB")  # 0x41 flags, target, x, y, style
+_HURT_V2_TAIL = struct.Struct("<hBBb")  # 0x75 after the reason: damage .. cooldown
+_DEATH_V2_TAIL = struct.Struct("<hBB")  # 0x76 after the reason: damage, dir, flags
+_TILE_HEADER = struct.Struct("<iihh")  # 0x0A x_start, y_start, width, height
 NET_TEXT_MODULE_ID = 1  # NetworkInitializer: NetLiquidModule(0), NetTextModule(1)
 _WARNED_FRAME_IMPORTANT = False
 DEBUG = False
@@ -54,19 +108,19 @@ def log_packet(direction: str, packet: bytes):
         if DEBUG_HEX:
             print(binascii.hexlify(packet).decode())
         return
-    length = int.from_bytes(packet[:2], "little")
+    length = _LEN_UNPACK(packet)[0]
     msg_type = packet[2]
     if not _should_log_type(msg_type):
         return
     print(f"[{direction}] type=0x{msg_type:02X} len={length}")
     if msg_type == 0x52 and length >= 5:
-        module_id = int.from_bytes(packet[3:5], "little")
+        module_id = _U16_UNPACK(packet, 3)[0]
         module_payload = packet[5:length]
         print(
             f"[{direction}] netmodule id={module_id} payload_len={len(module_payload)}"
         )
         if module_id == 0 and len(module_payload) >= 2:
-            change_count = int.from_bytes(module_payload[:2], "little")
+            change_count = _U16_UNPACK(packet, 5)[0]
             print(f"[{direction}] netmodule(NetLiquid) changes={change_count}")
     if DEBUG_HEX:
         print(binascii.hexlify(packet).decode())
@@ -75,17 +129,26 @@ def log_packet(direction: str, packet: bytes):
 def build_packet(msg_type: int, payload_dict=None) -> bytes:
     payload_dict = payload_dict or {}
     payload = payload_structs[msg_type].build(payload_dict)
-    length = 3 + len(payload)  # size(2) + type(1) + payload
-    return struct.pack("<HB", length, msg_type) + payload
+    return build_raw_packet(msg_type, payload)
 
 
 def build_raw_packet(msg_type: int, payload: bytes) -> bytes:
-    length = 3 + len(payload)
-    return struct.pack("<HB", length, msg_type) + payload
+    length = 3 + len(payload)  # size(2) + type(1) + payload
+    # header pack + one concat: for packets this small it beats pack_into
+    # on a preallocated bytearray plus the bytes() copy out of it
+    return _HEADER_PACK(length, msg_type) + payload
+
+
+REQUEST_WORLD_INFO_PACKET = build_raw_packet(0x06, b"")  # $06 has no payload
+_TINY_VARINT = [bytes((i,)) for i in range(0x80)]
 
 
 def write_7bit_encoded_int(n: int) -> bytes:
     # .NET BinaryWriter 7-bit encoded int
+    if n < 0x80:
+        return _TINY_VARINT[n]  # one byte (almost every string length)
+    if n < 0x4000:
+        return bytes(((n & 0x7F) | 0x80, n >> 7))
     out = bytearray()
     while n >= 0x80:
         out.append((n & 0x7F) | 0x80)
@@ -134,272 +197,506 @@ class ByteReader:
         return out
 
     def read_byte(self) -> int:
-        return self.read(1)[0]
+        pos = self.pos
+        if pos >= len(self.data):
+            raise EOFError("unexpected EOF")
+        self.pos = pos + 1
+        return self.data[pos]
+
+    def _unpack(self, st: struct.Struct):
+        # unpack straight from the buffer at pos; no intermediate bytes slice
+        end = self.pos + st.size
+        if end > len(self.data):
+            raise EOFError("unexpected EOF")
+        value = st.unpack_from(self.data, self.pos)[0]
+        self.pos = end
+        return value
+
+    def read_struct(self, st: struct.Struct) -> tuple:
+        end = self.pos + st.size
+        if end > len(self.data):
+            raise EOFError("unexpected EOF")
+        values = st.unpack_from(self.data, self.pos)
+        self.pos = end
+        return values
 
     def read_int16(self) -> int:
-        return struct.unpack("<h", self.read(2))[0]
+        return self._unpack(_I16)
 
     def read_uint16(self) -> int:
-        return struct.unpack("<H", self.read(2))[0]
+        return self._unpack(_U16)
 
     def read_int32(self) -> int:
-        return struct.unpack("<i", self.read(4))[0]
+        return self._unpack(_I32)
 
     def read_float(self) -> float:
-        return struct.unpack("<f", self.read(4))[0]
+        return self._unpack(_F32)
 
     def read_int8(self) -> int:
-        return struct.unpack("<b", self.read(1))[0]
+        return self._unpack(_I8)
 
     def read_string(self) -> str:
         return read_dotnet_string(self)
 
 
-def decode_teleport(payload: bytes):
+@dataclass(slots=True)
+class TeleportInfo:
+    flags_raw: int
+    mode: int
+    target: int
+    x: float
+    y: float
+    style: int
+    extra: int | None
+
+    @property
+    def flags(self) -> dict:
+        # decoded flag bits; only built when someone looks (debug output)
+        bits = self.flags_raw
+        return {
+            "to_npc_or_style1": bool(bits & 0x01),
+            "style2": bool(bits & 0x02),
+            "flag9": bool(bits & 0x04),
+            "has_extra": bool(bits & 0x08),
+        }
+
+
+def decode_teleport(payload: bytes) -> TeleportInfo:
     # Based on MessageBuffer.cs case 65
     r = ByteReader(payload)
-    bits = r.read_byte()
-    target = r.read_int16()
-    x = r.read_float()
-    y = r.read_float()
-    style = r.read_byte()
-    mode = 0
-    if bits & 0x01:
-        mode += 1
-    if bits & 0x02:
-        mode += 2
-    flags = {
-        "to_npc_or_style1": bool(bits & 0x01),
-        "style2": bool(bits & 0x02),
-        "flag9": bool(bits & 0x04),
-        "has_extra": bool(bits & 0x08),
-    }
-    extra = None
-    if flags["has_extra"]:
-        extra = r.read_int32()
-    return {
-        "flags_raw": bits,
-        "mode": mode,
-        "target": target,
-        "x": x,
-        "y": y,
-        "style": style,
-        "flags": flags,
-        "extra": extra,
-    }
+    bits, target, x, y, style = r.read_struct(_TELEPORT_HEAD)
+    extra = r.read_int32() if bits & 0x08 else None
+    # mode: bit 0 adds 1, bit 1 adds 2
+    return TeleportInfo(bits, bits & 0x03, target, x, y, style, extra)
+
+
+# PlayerDeathReason fixed fields in wire order: (flag bit, key, struct code)
+_DEATH_REASON_FIELDS = (
+    (0x01, "source_player", "h"),
+    (0x02, "source_npc", "h"),
+    (0x04, "source_projectile_index", "h"),
+    (0x08, "source_other", "B"),
+    (0x10, "source_projectile_type", "h"),
+    (0x20, "source_item_type", "h"),
+    (0x40, "source_item_prefix", "B"),
+)
+
+
+def _death_reason_layouts() -> list:
+    # one (keys, Struct) per combination of the 7 fixed-field bits, so a reason
+    # is read with a single unpack_from whatever flags are set
+    layouts = []
+    for bits in range(0x80):
+        fields = [(key, code) for bit, key, code in _DEATH_REASON_FIELDS if bits & bit]
+        keys = tuple(key for key, _ in fields)
+        layouts.append((keys, struct.Struct("<" + "".join(c for _, c in fields))))
+    return layouts
+
+
+_DEATH_REASON_LAYOUTS = _death_reason_layouts()
 
 
 def decode_player_death_reason(reader: ByteReader) -> dict:
     bits = reader.read_byte()
     reason = {"flags_raw": bits}
-    if bits & 0x01:
-        reason["source_player"] = reader.read_int16()
-    if bits & 0x02:
-        reason["source_npc"] = reader.read_int16()
-    if bits & 0x04:
-        reason["source_projectile_index"] = reader.read_int16()
-    if bits & 0x08:
-        reason["source_other"] = reader.read_byte()
-    if bits & 0x10:
-        reason["source_projectile_type"] = reader.read_int16()
-    if bits & 0x20:
-        reason["source_item_type"] = reader.read_int16()
-    if bits & 0x40:
-        reason["source_item_prefix"] = reader.read_byte()
+    keys, st = _DEATH_REASON_LAYOUTS[bits & 0x7F]
+    if keys:
+        reason.update(zip(keys, reader.read_struct(st)))
     if bits & 0x80:
         reason["custom_reason"] = reader.read_string()
     return reason
 
 
-def decode_player_hurt_v2(payload: bytes) -> dict:
+@dataclass(slots=True)
+class PlayerHurtInfo:
+    player_slot: int
+    reason: dict
+    damage: int
+    hit_dir: int
+    crit: bool
+    pvp: bool
+    cooldown: int
+
+
+@dataclass(slots=True)
+class PlayerDeathInfo:
+    player_slot: int
+    reason: dict
+    damage: int
+    hit_dir: int
+    pvp: bool
+
+
+def decode_player_hurt_v2(payload: bytes) -> PlayerHurtInfo:
     r = ByteReader(payload)
     player_slot = r.read_byte()
     reason = decode_player_death_reason(r)
-    damage = r.read_int16()
-    hit_dir = r.read_byte() - 1
-    flags = r.read_byte()
-    crit = bool(flags & 0x01)
-    pvp = bool(flags & 0x02)
-    cooldown = r.read_int8()
-    return {
-        "player_slot": player_slot,
-        "reason": reason,
-        "damage": damage,
-        "hit_dir": hit_dir,
-        "crit": crit,
-        "pvp": pvp,
-        "cooldown": cooldown,
-    }
+    damage, hit_dir, flags, cooldown = r.read_struct(_HURT_V2_TAIL)
+    return PlayerHurtInfo(
+        player_slot,
+        reason,
+        damage,
+        hit_dir - 1,
+        bool(flags & 0x01),
+        bool(flags & 0x02),
+        cooldown,
+    )
 
 
-def decode_player_death_v2(payload: bytes) -> dict:
+def decode_player_death_v2(payload: bytes) -> PlayerDeathInfo:
     r = ByteReader(payload)
     player_slot = r.read_byte()
     reason = decode_player_death_reason(r)
-    damage = r.read_int16()
-    hit_dir = r.read_byte() - 1
-    flags = r.read_byte()
-    pvp = bool(flags & 0x01)
-    return {
-        "player_slot": player_slot,
-        "reason": reason,
-        "damage": damage,
-        "hit_dir": hit_dir,
-        "pvp": pvp,
-    }
+    damage, hit_dir, flags = r.read_struct(_DEATH_V2_TAIL)
+    return PlayerDeathInfo(player_slot, reason, damage, hit_dir - 1, bool(flags & 0x01))
+
+
+def _tile_block_wbits(payload: bytes) -> int:
+    # Tile blocks are deflate-compressed, with or without a zlib header.
+    # Sniff the header instead of failing a zlib-wrapped decode on every raw block.
+    zlib_header = (
+        len(payload) >= 2
+        and payload[0] & 0x0F == 8
+        and (payload[0] << 8 | payload[1]) % 31 == 0
+    )
+    return 15 if zlib_header else -15
 
 
 def _decompress_tile_block(payload: bytes) -> bytes:
-    # Tile blocks are deflate-compressed with zlib header in 1.4.4+.
+    # size the output up front (blocks inflate ~2-3.5x)
+    bufsize = len(payload) * 4
+    wbits = _tile_block_wbits(payload)
+    try:
+        return zlib.decompress(payload, wbits, bufsize)
+    except zlib.error:
+        # fallback: the other framing (malformed or misdetected header)
+        return zlib.decompress(payload, -wbits, bufsize)
+
+
+def _decompress_tile_header(payload: bytes) -> bytes:
+    # inflate only the section header; stops after _TILE_HEADER.size bytes
+    wbits = _tile_block_wbits(payload)
     try:
-        return zlib.decompress(payload)
+        header = zlib.decompressobj(wbits).decompress(payload, _TILE_HEADER.size)
     except zlib.error:
-        # fallback: raw deflate (older captures or malformed)
-        return zlib.decompress(payload, wbits=-15)
+        header = zlib.decompressobj(-wbits).decompress(payload, _TILE_HEADER.size)
+    if len(header) < _TILE_HEADER.size:
+        raise EOFError("unexpected EOF")
+    return header
 
 
-def parse_tile_section(payload: bytes, tile_frame_important: set[int]):
+@dataclass(slots=True)
+class TileSection:
+    x_start: int
+    y_start: int
+    width: int
+    height: int
+    # active tiles as parallel arrays (x, y, tile_type); no per-tile dict/tuple
+    xs: array = field(default_factory=lambda: array("i"))
+    ys: array = field(default_factory=lambda: array("i"))
+    types: array = field(default_factory=lambda: array("H"))
+
+
+def parse_tile_section(payload: bytes, tile_frame_important_lut: bytes) -> TileSection:
     # 0x0A payload is deflate-compressed
     global _WARNED_FRAME_IMPORTANT
-    if not tile_frame_important:
+    if not tile_frame_important_lut:
         if not _WARNED_FRAME_IMPORTANT:
             print(
                 "Warning: tileFrameImportant list missing; skipping tile parse (store no tiles)."
             )
             _WARNED_FRAME_IMPORTANT = True
-        data = _decompress_tile_block(payload)
-        r = ByteReader(data)
-        x_start = r.read_int32()
-        y_start = r.read_int32()
-        width = r.read_int16()
-        height = r.read_int16()
-        return {
-            "x_start": x_start,
-            "y_start": y_start,
-            "width": width,
-            "height": height,
-            "tiles": {},
-        }
+        # no tiles will be stored, so only the 12-byte header is inflated
+        header = _decompress_tile_header(payload)
+        return TileSection(*_TILE_HEADER.unpack(header))
     data = _decompress_tile_block(payload)
-    r = ByteReader(data)
-    x_start = r.read_int32()
-    y_start = r.read_int32()
-    width = r.read_int16()
-    height = r.read_int16()
-
-    tiles = {}
-    rle = 0
-    last_tile = None
-
-    for y in range(y_start, y_start + height):
-        for x in range(x_start, x_start + width):
-            if rle != 0:
-                rle -= 1
-                if last_tile and last_tile["active"]:
-                    tiles[(x, y)] = last_tile["type"]
-                continue
-
-            b4 = r.read_byte()
-            b3 = b2 = b = 0
-
+    if len(data) < _TILE_HEADER.size:
+        raise EOFError("unexpected EOF")
+    x_start, y_start, width, height = _TILE_HEADER.unpack_from(data)
+
+    section = TileSection(x_start, y_start, width, height)
+    if _decode_tiles_native is not None:
+        _decode_tiles_native(section, data, _TILE_HEADER.size, tile_frame_important_lut)
+        return section
+    try:
+        _decode_tiles(section, data, _TILE_HEADER.size, tile_frame_important_lut)
+    except (IndexError, struct.error):
+        raise EOFError("unexpected EOF") from None
+    return section
+
+
+def _tile_skip_table() -> bytes:
+    # bytes to skip after the tile type/frame, indexed by
+    # (b4 & 0x1E) | (b2 & 0x58) << 2 (active, wall, liquid, color/wall flags)
+    table = bytearray(0x200)
+    for b4 in range(0, 0x20, 2):
+        for b2 in (0, 0x08, 0x10, 0x18, 0x40, 0x48, 0x50, 0x58):
+            n = 0
+            if b4 & 2 and b2 & 8:
+                n += 1  # tile color
+            if b4 & 4:
+                n += 1  # wall
+                if b2 & 0x10:
+                    n += 1  # wall color
+            if b4 & 0x18:
+                n += 1  # liquid amount
+            if b2 & 0x40:
+                n += 1  # wall high byte
+            table[b4 | b2 << 2] = n
+    return bytes(table)
+
+
+_TILE_SKIP = _tile_skip_table()
+RLE_BULK_MIN = 8  # shorter runs are cheaper to append tile by tile
+
+
+def _decode_tiles(section: TileSection, data, pos, tile_frame_important_lut):
+    # Walks the tiles in row-major order by flat index. Bytes are read by direct
+    # indexing (no ByteReader calls per field), and an RLE run is filled with
+    # bulk extends instead of re-entering the loop for every repeated tile.
+    add_x = section.xs.append
+    add_y = section.ys.append
+    add_type = section.types.append
+    extend_x = section.xs.extend
+    extend_y = section.ys.extend
+    extend_type = section.types.extend
+    row_xs = array("i", range(section.x_start, section.x_start + section.width))
+    x_start = section.x_start
+    y_start = section.y_start
+    width = section.width
+    u16 = _U16_UNPACK
+    i16 = _I16_UNPACK
+    skip_tbl = _TILE_SKIP
+    total = width * section.height
+    i = 0
+    while i < total:
+        b4 = data[pos]
+        pos += 1
+        b2 = 0
+        if b4 & 1:
+            b3 = data[pos]
+            pos += 1
+            if b3 & 1:
+                b2 = data[pos]
+                pos += 1
+                if b2 & 1:
+                    pos += 1
+
+        tile_type = None
+        if b4 & 2:
+            if b4 & 0x20:
+                tile_type = u16(data, pos)[0]
+                pos += 2
+            else:
+                tile_type = data[pos]
+                pos += 1
+            if tile_frame_important_lut[tile_type]:
+                pos += 4  # frame x/y
+
+        # tile color, wall (+ color), liquid, wall high byte: one table lookup
+        pos += skip_tbl[(b4 & 0x1E) | (b2 & 0x58) << 2]
+
+        rle_flag = b4 >> 6
+        if rle_flag == 1:
+            rle = data[pos]
+            pos += 1
+        elif rle_flag:
+            rle = i16(data, pos)[0]
+            pos += 2
+        else:
+            rle = 0
+
+        if tile_type is not None:
+            add_x(x_start + i % width)
+            add_y(y_start + i // width)
+            add_type(tile_type)
+            if rle >= RLE_BULK_MIN:
+                # expand long runs one row segment at a time with bulk extends
+                j = i + 1
+                end = min(j + rle, total)
+                while j < end:
+                    row, col = divmod(j, width)
+                    n = min(end - j, width - col)
+                    extend_x(row_xs[col : col + n])
+                    extend_y(array("i", (y_start + row,)) * n)
+                    extend_type(array("H", (tile_type,)) * n)
+                    j += n
+            elif rle > 0:
+                for j in range(i + 1, min(i + 1 + rle, total)):
+                    add_x(x_start + j % width)
+                    add_y(y_start + j // width)
+                    add_type(tile_type)
+        if rle > 0:
+            i += rle
+        i += 1
+
+
+if njit is not None:
+    _TILE_SKIP_NP = np.frombuffer(_TILE_SKIP, np.uint8)
+    # longest tile record: 4 header + 2 type + 4 frame + 5 optional + 2 rle
+    _TILE_RECORD_MAX = 17
+
+    # nogil: tile pool workers decode in parallel, not just inflate
+    @njit(cache=True, boundscheck=False, nogil=True)
+    def _decode_tiles_jit(data, pos, end, x_start, y_start, width, height, lut, skip):
+        # same walk as _decode_tiles; data carries _TILE_RECORD_MAX bytes of
+        # padding past end so a record started before end never reads out of bounds
+        total = width * height
+        xs = np.empty(total, np.int32)
+        ys = np.empty(total, np.int32)
+        types = np.empty(total, np.uint16)
+        n = 0
+        i = 0
+        while i < total:
+            if pos >= end:
+                return xs, ys, types, n, end + 1  # truncated
+            b4 = data[pos]
+            pos += 1
+            b2 = 0
             if b4 & 1:
-                b3 = r.read_byte()
+                b3 = data[pos]
+                pos += 1
                 if b3 & 1:
-                    b2 = r.read_byte()
+                    b2 = data[pos]
+                    pos += 1
                     if b2 & 1:
-                        b = r.read_byte()
+                        pos += 1
 
             active = False
-            tile_type = None
-
+            tile_type = 0
             if b4 & 2:
                 active = True
                 if b4 & 0x20:
-                    tile_type = r.read_uint16()
+                    tile_type = data[pos] | (np.int32(data[pos + 1]) << 8)
+                    pos += 2
                 else:
-                    tile_type = r.read_byte()
-
-                if tile_type in tile_frame_important:
-                    _ = r.read_int16()
-                    _ = r.read_int16()
-                if b2 & 8:
-                    _ = r.read_byte()  # tile color
-
-            if b4 & 4:
-                _ = r.read_byte()  # wall
-                if b2 & 0x10:
-                    _ = r.read_byte()  # wall color
-
-            liquid_type = (b4 & 0x18) >> 3
-            if liquid_type != 0:
-                _ = r.read_byte()
+                    tile_type = np.int32(data[pos])
+                    pos += 1
+                if lut[tile_type]:
+                    pos += 4
 
-            if b2 & 0x40:
-                _ = r.read_byte()  # wall high byte
+            pos += skip[(b4 & 0x1E) | ((b2 & 0x58) << 2)]
 
-            rle_flag = (b4 & 0xC0) >> 6
+            rle = 0
+            rle_flag = b4 >> 6
             if rle_flag == 1:
-                rle = r.read_byte()
-            elif rle_flag in (2, 3):
-                rle = r.read_int16()
-            else:
-                rle = 0
+                rle = np.int32(data[pos])
+                pos += 1
+            elif rle_flag:
+                rle = data[pos] | (np.int32(data[pos + 1]) << 8)
+                if rle >= 0x8000:
+                    rle -= 0x10000
+                pos += 2
 
-            last_tile = {"active": active, "type": tile_type}
             if active:
-                tiles[(x, y)] = tile_type
-
-    return {
-        "x_start": x_start,
-        "y_start": y_start,
-        "width": width,
-        "height": height,
-        "tiles": tiles,
-    }
+                stop = i + 1 + rle if rle > 0 else i + 1
+                if stop > total:
+                    stop = total
+                for j in range(i, stop):
+                    xs[n] = x_start + j % width
+                    ys[n] = y_start + j // width
+                    types[n] = tile_type
+                    n += 1
+            if rle > 0:
+                i += rle
+            i += 1
+        return xs, ys, types, n, pos
+
+    def _decode_tiles_native(section: TileSection, data, pos, tile_frame_important_lut):
+        buf = np.frombuffer(bytes(data) + bytes(_TILE_RECORD_MAX), np.uint8)
+        xs, ys, types, n, end = _decode_tiles_jit(
+            buf,
+            pos,
+            len(data),
+            section.x_start,
+            section.y_start,
+            section.width,
+            section.height,
+            np.frombuffer(tile_frame_important_lut, np.uint8),
+            _TILE_SKIP_NP,
+        )
+        if end > len(data):
+            raise EOFError("unexpected EOF")
+        section.xs.frombytes(xs[:n].tobytes())
+        section.ys.frombytes(ys[:n].tobytes())
+        section.types.frombytes(types[:n].tobytes())
+
+else:
+    _decode_tiles_native = None
 
 
 def build_netmodule_packet(module_id: int, payload: bytes) -> bytes:
     length = 2 + 1 + 2 + len(payload)
-    return struct.pack("<HBH", length, 0x52, module_id) + payload
+    return _NETMOD_HEADER_PACK(length, 0x52, module_id) + payload
 
 
 def recv_exact(sock, n):
     # print(f"Receiving {n} bytes")
-    buf = b""
-    while len(buf) < n:
-        chunk = sock.recv(n - len(buf))
-        # print(f"Received chunk: {chunk}")
-        if not chunk:
-            raise ConnectionError(f"disconnected, {len(buf)}/{n}")
-        buf += chunk
-    return buf
+    # receive straight into one preallocated buffer instead of growing bytes
+    buf = bytearray(n)
+    view = memoryview(buf)
+    off = 0
+    while off < n:
+        got = sock.recv_into(view[off:])
+        # print(f"Received chunk: {got} bytes")
+        if not got:
+            raise ConnectionError(f"disconnected, {off}/{n}")
+        off += got
+    return bytes(buf)
 
 
 class PacketStream:
     def __init__(self, sock):
         self.sock = sock
         self.buf = bytearray()
-
-    def _feed(self, data: bytes):
-        self.buf.extend(data)
+        # start of the first unconsumed packet in buf; consumed bytes are
+        # dropped once per recv instead of once per packet
+        self.pos = 0
+        # one receive buffer reused for every recv_into (no bytes object per recv)
+        self._recv_buf = bytearray(65536)
+        self._recv_view = memoryview(self._recv_buf)
+
+    def _recv(self, flags: int = 0) -> int:
+        n = self.sock.recv_into(self._recv_view, 0, flags)
+        if n:
+            pos = self.pos
+            # drop consumed bytes only when nothing is left to shift, or when the
+            # dead prefix is large and outweighs the unread tail
+            if pos and (
+                pos == len(self.buf)
+                or (pos >= STREAM_COMPACT_MIN and pos > len(self.buf) // 2)
+            ):
+                del self.buf[:pos]
+                self.pos = 0
+            self.buf += self._recv_view[:n]
+        return n
 
     def _next_message(self):
-        if len(self.buf) < 2:
+        pos = self.pos
+        avail = len(self.buf) - pos
+        if avail < 2:
             return None
-        length = int.from_bytes(self.buf[:2], "little")
-        if len(self.buf) < length:
+        length = _LEN_UNPACK(self.buf, pos)[0]
+        if avail < length:
             return None
-        packet = bytes(self.buf[:length])
-        del self.buf[:length]
-        log_packet("S→C", packet)
+        self.pos = pos + length
+        # parse straight from a view on buf; only the parsed fields are copied
+        with memoryview(self.buf) as view, view[pos : pos + length] as packet:
+            return self._parse_packet(length, packet)
+
+    def _parse_packet(self, length: int, packet: memoryview):
+        if DEBUG:  # skip the call entirely on the hot path
+            log_packet("S→C", packet)
         try:
-            return TerrariaMessage.parse(packet)
+            # type-indexed payload parser on the view; no TerrariaMessage pass
+            msg_type, payload = parse_message(packet)
+            return Container(length=length, type=msg_type, payload=payload)
         except Exception as e:
             if DEBUG:
                 msg_type = packet[2] if len(packet) >= 3 else None
                 print(f"Parse error for type=0x{msg_type:02X}: {e}")
             msg_type = packet[2] if len(packet) >= 3 else 0
-            payload = packet[3:] if len(packet) >= 3 else b""
+            payload = bytes(packet[3:]) if len(packet) >= 3 else b""
             return SimpleNamespace(type=msg_type, payload=SimpleNamespace(raw=payload))
 
     def recv_message(self):
@@ -407,66 +704,284 @@ class PacketStream:
             msg = self._next_message()
             if msg is not None:
                 return msg
-            chunk = self.sock.recv(65536)
-            if not chunk:
+            if not self._recv():
                 raise ConnectionError("disconnected while waiting for message")
-            self._feed(chunk)
+
+    def _recv_nowait(self) -> int | None:
+        # returns None when nothing is waiting on the socket
+        if _MSG_DONTWAIT:
+            try:
+                return self._recv(_MSG_DONTWAIT)
+            except BlockingIOError:
+                return None
+        # no MSG_DONTWAIT (Windows): check readability first
+        r, _, _ = select.select([self.sock], [], [], 0)
+        return self._recv() if r else None
 
     def poll_messages(self, max_messages: int = 50):
-        # Non-blocking poll using select; returns any fully parsed messages.
-        msgs = []
+        # Non-blocking poll; returns any fully parsed messages.
+        return list(self.iter_messages(max_messages))
+
+    def iter_messages(self, max_messages: int = 50):
+        # poll_messages without building the list: yields each message as it is
+        # parsed, for callers that handle them one by one
         while True:
-            r, _, _ = select.select([self.sock], [], [], 0)
-            if not r:
+            n = self._recv_nowait()
+            if n is None:
                 break
-            chunk = self.sock.recv(65536)
-            if not chunk:
+            if not n:
                 raise ConnectionError("disconnected during poll")
-            self._feed(chunk)
+            if n < len(self._recv_buf):
+                break  # short read: socket drained, skip the extra EAGAIN recv
 
-        while len(msgs) < max_messages:
+        for _ in range(max_messages):
             msg = self._next_message()
             if msg is None:
                 break
-            msgs.append(msg)
-        return msgs
+            yield msg
+
+
+class SpatialBuckets:
+    # uniform grid of entity keys by world position (CELL_PX cells), so radius
+    # queries only visit the cells around the query point
+    CELL_PX = 256
+
+    def __init__(self):
+        self.buckets = {}  # (cx, cy) -> {key: (x, y)}
+        self.cells = {}  # key -> (cx, cy)
+
+    def move(self, key, x, y):
+        try:
+            cell = (int(x // self.CELL_PX), int(y // self.CELL_PX))
+        except (TypeError, ValueError, OverflowError):
+            # no usable position: keep it out of the index
+            self.discard(key)
+            return
+        old = self.cells.get(key)
+        if old != cell:
+            if old is not None:
+                self._drop(old, key)
+            self.cells[key] = cell
+        bucket = self.buckets.get(cell)
+        if bucket is None:
+            bucket = self.buckets[cell] = {}
+        bucket[key] = (x, y)
+
+    def discard(self, key):
+        cell = self.cells.pop(key, None)
+        if cell is not None:
+            self._drop(cell, key)
+
+    def _drop(self, cell, key):
+        bucket = self.buckets[cell]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[cell]
+
+    def query(self, x: float, y: float, radius: float) -> list:
+        size = self.CELL_PX
+        cx0, cx1 = int((x - radius) // size), int((x + radius) // size)
+        cy0, cy1 = int((y - radius) // size), int((y + radius) // size)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self.buckets):
+            buckets = self.buckets
+            candidates = [
+                bucket
+                for cx in range(cx0, cx1 + 1)
+                for cy in range(cy0, cy1 + 1)
+                if (bucket := buckets.get((cx, cy))) is not None
+            ]
+        else:
+            # huge radius: walking the occupied cells is cheaper
+            candidates = self.buckets.values()
+        r2 = radius * radius
+        out = []
+        for bucket in candidates:
+            for key, (ex, ey) in bucket.items():
+                dx = ex - x
+                dy = ey - y
+                if dx * dx + dy * dy <= r2:
+                    out.append(key)
+        return out
+
+
+def _entity_pos(entity):
+    return getattr(entity, "position_x", None), getattr(entity, "position_y", None)
 
 
 class WorldState:
     def __init__(self):
-        self.tiles = {}  # (x,y) -> tile_type
+        # dense row-major grid of tile types (index y * width + x), 2 bytes per
+        # tile; EMPTY_TILE marks cells with no active tile. Sized on $07.
+        self.width = 0
+        self.height = 0
+        self.tiles = array("H")
+        self._grid_view = None  # cached numpy view of tiles (see grid_view)
         self.items = {}  # item_slot -> item dict
         self.npcs = {}  # npc_slot -> npc dict
+        self.items_version = 0  # bumped on every item change
+        self._items_by_owner = {}  # owner -> {item_slot: None} (ordered set)
+        # position indexes for get_nearby_items / get_nearby_npcs
+        self._item_index = SpatialBuckets()
+        self._npc_index = SpatialBuckets()
         self.player_pos = {}  # player_slot -> (x,y)
         self.tile_sections = 0
 
+    def allocate_tiles(self, width: int, height: int):
+        # (re)size the grid; tiles already stored inside the new bounds are kept
+        old_tiles, old_width = self.tiles, self.width
+        tiles = array("H", [EMPTY_TILE]) * (width * height)
+        keep = min(old_width, width)
+        for y in range(min(self.height, height)):
+            tiles[y * width : y * width + keep] = old_tiles[
+                y * old_width : y * old_width + keep
+            ]
+        self.width = width
+        self.height = height
+        self.tiles = tiles
+        self._grid_view = None
+
+    def _ensure_region(self, x1: int, y1: int):
+        # grow the grid to cover [0, x1) x [0, y1), e.g. sections seen before $07
+        if x1 > self.width or y1 > self.height:
+            self.allocate_tiles(max(x1, self.width), max(y1, self.height))
+
+    def grid_view(self):
+        # zero-copy uint16 numpy view of tiles for the JIT helpers; tiles is
+        # replaced (never resized) on reallocation, so the view stays valid
+        if self._grid_view is None:
+            self._grid_view = np.frombuffer(self.tiles, np.uint16)
+        return self._grid_view
+
+    def tile_count(self) -> int:
+        return len(self.tiles) - self.tiles.count(EMPTY_TILE)
+
     def update_tile_section(self, section):
-        self.tiles.update(section["tiles"])
+        self._ensure_region(
+            section.x_start + section.width, section.y_start + section.height
+        )
+        tiles = self.tiles
+        width = self.width
+        height = self.height
+        if section.x_start >= 0 and section.y_start >= 0:
+            # the grid now covers the whole section rectangle: no per-tile checks
+            if np is not None and section.types:
+                # one scatter into a view of the grid instead of a Python loop
+                index = np.frombuffer(section.ys, np.int32).astype(np.intp)
+                index *= width
+                index += np.frombuffer(section.xs, np.int32)
+                self.grid_view()[index] = np.frombuffer(section.types, np.uint16)
+            else:
+                for x, y, tile_type in zip(section.xs, section.ys, section.types):
+                    tiles[y * width + x] = tile_type
+        else:
+            for x, y, tile_type in zip(section.xs, section.ys, section.types):
+                if 0 <= x < width and 0 <= y < height:
+                    tiles[y * width + x] = tile_type
         self.tile_sections += 1
 
+    def _reindex_owner(self, item_slot, old_owner, new_owner):
+        if old_owner == new_owner:
+            return
+        if old_owner is not None:
+            owned = self._items_by_owner[old_owner]
+            del owned[item_slot]
+            if not owned:
+                del self._items_by_owner[old_owner]
+        if new_owner is not None:
+            self._items_by_owner.setdefault(new_owner, {})[item_slot] = None
+
     def update_item(self, item):
+        old = self.items.get(item.item_slot)
         self.items[item.item_slot] = item
+        self.items_version += 1
+        self._item_index.move(item.item_slot, *_entity_pos(item))
+        self._reindex_owner(
+            item.item_slot, getattr(old, "owner", None), getattr(item, "owner", None)
+        )
 
     def update_item_owner(self, item_slot, owner):
-        if item_slot in self.items:
-            self.items[item_slot].owner = owner
+        item = self.items.get(item_slot)
+        if item is not None:
+            old_owner = getattr(item, "owner", None)
+            item.owner = owner
+            self.items_version += 1
+            self._reindex_owner(item_slot, old_owner, owner)
 
     def remove_item(self, item_slot):
-        if item_slot in self.items:
-            del self.items[item_slot]
+        item = self.items.pop(item_slot, None)
+        if item is not None:
+            self._item_index.discard(item_slot)
+            self.items_version += 1
+            self._reindex_owner(item_slot, getattr(item, "owner", None), None)
+
+    def items_owned_by(self, owner) -> list:
+        items = self.items
+        return [items[slot] for slot in self._items_by_owner.get(owner, ())]
+
+    def nearby_items_owned_by(self, owner, x: float, y: float, radius: float) -> list:
+        owned = self._items_by_owner.get(owner, ())
+        items = self.items
+        if len(owned) > 8:
+            # many reservations: let the position index do the distance check
+            return [
+                items[slot]
+                for slot in self._item_index.query(x, y, radius)
+                if slot in owned
+            ]
+        r2 = radius * radius
+        out = []
+        for slot in owned:
+            item = items[slot]
+            try:
+                dx = item.position_x - x
+                dy = item.position_y - y
+            except Exception:
+                continue
+            if dx * dx + dy * dy <= r2:
+                out.append(item)
+        return out
 
     def update_npc(self, npc):
         self.npcs[npc.npc_slot] = npc
+        self._npc_index.move(npc.npc_slot, *_entity_pos(npc))
 
     def update_player_pos(self, slot, x, y):
         self.player_pos[slot] = (x, y)
 
     def is_solid(self, tx: int, ty: int) -> bool:
         # TODO: use solid tile metadata; for now treat any active tile as solid.
-        return (tx, ty) in self.tiles
+        return self.get_tile(tx, ty) is not None
+
+    def column_solid(self, tx: int, top: int, bottom: int) -> bool:
+        # any solid tile in column tx, rows top..bottom (inclusive)
+        if not 0 <= tx < self.width:
+            return False
+        top = max(top, 0)
+        bottom = min(bottom, self.height - 1)
+        if top > bottom:
+            return False
+        w = self.width
+        col = self.tiles[top * w + tx : bottom * w + tx + 1 : w]
+        return col.count(EMPTY_TILE) != len(col)
+
+    def row_solid(self, ty: int, left: int, right: int) -> bool:
+        # any solid tile in row ty, columns left..right (inclusive)
+        if not 0 <= ty < self.height:
+            return False
+        left = max(left, 0)
+        right = min(right, self.width - 1)
+        if left > right:
+            return False
+        base = ty * self.width
+        row = self.tiles[base + left : base + right + 1]
+        return row.count(EMPTY_TILE) != len(row)
 
     def get_tile(self, tx: int, ty: int):
-        return self.tiles.get((tx, ty))
+        if 0 <= tx < self.width and 0 <= ty < self.height:
+            tile_type = self.tiles[ty * self.width + tx]
+            if tile_type != EMPTY_TILE:
+                return tile_type
+        return None
 
     def get_tile_at_world(self, x: float, y: float):
         tx = int(x // 16)
@@ -476,39 +991,56 @@ class WorldState:
     def get_nearby_tiles(self, x: float, y: float, radius_tiles: int = 3):
         tx = int(x // 16)
         ty = int(y // 16)
+        width = self.width
+        tiles = self.tiles
+        x0 = max(tx - radius_tiles, 0)
+        x1 = min(tx + radius_tiles + 1, width)
         out = []
-        for dy in range(-radius_tiles, radius_tiles + 1):
-            for dx in range(-radius_tiles, radius_tiles + 1):
-                tile_type = self.get_tile(tx + dx, ty + dy)
-                if tile_type is not None:
-                    out.append({"x": tx + dx, "y": ty + dy, "type": tile_type})
+        for row_y in range(
+            max(ty - radius_tiles, 0), min(ty + radius_tiles + 1, self.height)
+        ):
+            row = tiles[row_y * width + x0 : row_y * width + x1]
+            if row.count(EMPTY_TILE) == len(row):
+                continue  # all air: nothing to report for this row
+            for i, tile_type in enumerate(row):
+                if tile_type != EMPTY_TILE:
+                    out.append({"x": x0 + i, "y": row_y, "type": tile_type})
         return out
 
+    def get_nearby_tile_keys(self, x: float, y: float, radius_tiles: int = 3):
+        tx = int(x // 16)
+        ty = int(y // 16)
+        width = self.width
+        tiles = self.tiles
+        x0 = max(tx - radius_tiles, 0)
+        x1 = min(tx + radius_tiles + 1, width)
+        keys = []
+        for row_y in range(
+            max(ty - radius_tiles, 0), min(ty + radius_tiles + 1, self.height)
+        ):
+            # scan one row slice of the grid at a time
+            row = tiles[row_y * width + x0 : row_y * width + x1]
+            for i, tile_type in enumerate(row):
+                if tile_type != EMPTY_TILE:
+                    keys.append(tile_key(x0 + i, row_y))
+        return frozenset(keys)
+
     def get_nearby_items(self, x: float, y: float, radius_px: float = 160.0):
-        out = []
-        r2 = radius_px * radius_px
-        for item in self.items.values():
-            try:
-                dx = item.position_x - x
-                dy = item.position_y - y
-            except Exception:
-                continue
-            if dx * dx + dy * dy <= r2:
-                out.append(item)
-        return out
+        items = self.items
+        return [items[slot] for slot in self._item_index.query(x, y, radius_px)]
 
     def get_nearby_npcs(self, x: float, y: float, radius_px: float = 320.0):
-        out = []
-        r2 = radius_px * radius_px
-        for npc in self.npcs.values():
-            try:
-                dx = npc.position_x - x
-                dy = npc.position_y - y
-            except Exception:
-                continue
-            if dx * dx + dy * dy <= r2:
-                out.append(npc)
-        return out
+        npcs = self.npcs
+        return [npcs[slot] for slot in self._npc_index.query(x, y, radius_px)]
+
+
+def apply_tile_sections(state: WorldState, pending: deque, wait: bool = False):
+    # apply parsed sections in arrival order; stop at the first unfinished one
+    while pending and (wait or pending[0].done()):
+        try:
+            state.update_tile_section(pending.popleft().result())
+        except Exception as e:
+            print(f"Tile section parse failed: {e}")
 
 
 class TeleportTracker:
@@ -536,15 +1068,19 @@ class InventoryState:
     def __init__(self, size: int):
         self.size = size
         self.slots = [None] * size
+        self._all = (1 << size) - 1
+        self._occupied = 0  # bit i set = slot i holds an item (kept by set_slot)
 
     def clear(self):
         self.slots = [None] * self.size
+        self._occupied = 0
 
     def find_empty_slot(self):
-        for i, item in enumerate(self.slots):
-            if item is None or item.get("item_id", 0) == 0 or item.get("stack", 0) == 0:
-                return i
-        return None
+        # lowest clear bit of the occupancy mask instead of scanning the slots
+        free = ~self._occupied & self._all
+        if not free:
+            return None
+        return (free & -free).bit_length() - 1
 
     def set_slot(self, idx: int, item_id: int, stack: int, prefix_id: int = 0):
         if idx < 0 or idx >= self.size:
@@ -554,6 +1090,10 @@ class InventoryState:
             "stack": stack,
             "prefix_id": prefix_id,
         }
+        if item_id == 0 or stack == 0:
+            self._occupied &= ~(1 << idx)
+        else:
+            self._occupied |= 1 << idx
 
 
 def _to_jsonable(obj):
@@ -565,6 +1105,8 @@ def _to_jsonable(obj):
         return [_to_jsonable(v) for v in obj]
     if hasattr(obj, "items"):
         return {k: _to_jsonable(v) for k, v in obj.items()}
+    if is_dataclass(obj):
+        return {f.name: _to_jsonable(getattr(obj, f.name)) for f in fields(obj)}
     if hasattr(obj, "__dict__"):
         return {k: _to_jsonable(v) for k, v in obj.__dict__.items()}
     return repr(obj)
@@ -578,7 +1120,7 @@ def dump_state(
 ):
     player_pos = state.player_pos.get(player_slot) if player_slot is not None else None
     summary = {
-        "tiles_loaded": len(state.tiles),
+        "tiles_loaded": state.tile_count(),
         "tile_sections": state.tile_sections,
         "items": len(state.items),
         "npcs": len(state.npcs),
@@ -602,7 +1144,13 @@ def dump_state(
         "nearby_npcs": nearby_npcs,
     }
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, ensure_ascii=True, indent=2))
+    if orjson is not None:
+        # same layout as json indent=2; int keys (player slots) become strings
+        path.write_bytes(
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
+    else:
+        path.write_text(json.dumps(data, ensure_ascii=True, indent=2))
     print(f"State dumped to {path}")
 
 
@@ -612,10 +1160,28 @@ def send(sock, msg_type, payload=None):
 
 
 def send_raw(sock, packet: bytes):
-    log_packet("C→S", packet)
+    if DEBUG:
+        log_packet("C→S", packet)
     sock.sendall(packet)
 
 
+def send_raw_batch(sock, packets: list[bytes]):
+    # one syscall for the burst: sendmsg gathers the packets straight from
+    # their own buffers (no joined copy); join only where sendmsg is missing
+    # (Windows), the batch exceeds IOV_MAX, or the kernel took a partial write
+    if DEBUG:
+        for packet in packets:
+            log_packet("C→S", packet)
+    sendmsg = getattr(sock, "sendmsg", None)
+    if sendmsg is not None and len(packets) <= SEND_IOV_MAX:
+        sent = sendmsg(packets)
+        if sent == sum(map(len, packets)):
+            return
+        sock.sendall(b"".join(packets)[sent:])
+        return
+    sock.sendall(b"".join(packets))
+
+
 def build_player_controls_packet(
     profile: VersionSpec,
     player_slot: int,
@@ -634,18 +1200,21 @@ def build_player_controls_packet(
     vel_y: float = 0.0,
     grav_dir: int = 1,
 ) -> bytes:
-    fmt = profile.message_formats.get("player_controls", "v1")
-    if fmt == "v0":
+    if profile.controls_v0:
         # Legacy format: control_flags + selected_item + position + velocity + flags
-        control_flags = 0
-        control_flags |= int(control_up) << 0
-        control_flags |= int(control_down) << 1
-        control_flags |= int(control_left) << 2
-        control_flags |= int(control_right) << 3
-        control_flags |= int(control_jump) << 4
-        control_flags |= int(control_use_item) << 5
-        payload = struct.pack(
-            "<BBBffffB",
+        # bools are ints: assemble the bits in one expression, no int() casts
+        control_flags = (
+            control_up
+            | control_down << 1
+            | control_left << 2
+            | control_right << 3
+            | control_jump << 4
+            | control_use_item << 5
+        )
+        st = _CTRL_V0_PACKET
+        return st.pack(
+            st.size,
+            0x0D,
             player_slot,
             control_flags,
             selected_item,
@@ -655,27 +1224,42 @@ def build_player_controls_packet(
             vel_y,
             0,
         )
-        return build_raw_packet(0x0D, payload)
 
     # v1 (1.4.4+)
-    flags1 = 0
-    flags1 |= int(control_up) << 0
-    flags1 |= int(control_down) << 1
-    flags1 |= int(control_left) << 2
-    flags1 |= int(control_right) << 3
-    flags1 |= int(control_jump) << 4
-    flags1 |= int(control_use_item) << 5
-    flags1 |= int(direction == 1) << 6
-
-    flags2 = 0
-    flags2 |= int(send_velocity) << 2
-    flags2 |= int(grav_dir == 1) << 4
+    flags1 = (
+        control_up
+        | control_down << 1
+        | control_left << 2
+        | control_right << 3
+        | control_jump << 4
+        | control_use_item << 5
+        | (direction == 1) << 6
+    )
+    flags2 = send_velocity << 2 | (grav_dir == 1) << 4
 
     flags3 = 0
     flags4 = 0
 
-    payload = struct.pack(
-        "<BBBBBBff",
+    if send_velocity:
+        st = _CTRL_V1_VEL_PACKET
+        return st.pack(
+            st.size,
+            0x0D,
+            player_slot,
+            flags1,
+            flags2,
+            flags3,
+            flags4,
+            selected_item,
+            x,
+            y,
+            vel_x,
+            vel_y,
+        )
+    st = _CTRL_V1_PACKET
+    return st.pack(
+        st.size,
+        0x0D,
         player_slot,
         flags1,
         flags2,
@@ -685,9 +1269,6 @@ def build_player_controls_packet(
         x,
         y,
     )
-    if send_velocity:
-        payload += struct.pack("<ff", vel_x, vel_y)
-    return build_raw_packet(0x0D, payload)
 
 
 def build_spawn_packet(
@@ -701,14 +1282,15 @@ def build_spawn_packet(
     team: int = 0,
     spawn_context: int = 0,
 ) -> bytes:
-    fmt = profile.message_formats.get("player_spawn", "v1")
-    if fmt == "v0":
-        payload = struct.pack("<Bii", player_slot, spawn_x, spawn_y)
-        return build_raw_packet(0x0C, payload)
+    if profile.spawn_v0:
+        st = _SPAWN_V0_PACKET
+        return st.pack(st.size, 0x0C, player_slot, spawn_x, spawn_y)
 
     # v1 (1.4.4+)
-    payload = struct.pack(
-        "<BhhihhBB",
+    st = _SPAWN_V1_PACKET
+    return st.pack(
+        st.size,
+        0x0C,
         player_slot,
         spawn_x,
         spawn_y,
@@ -718,7 +1300,336 @@ def build_spawn_packet(
         team,
         spawn_context,
     )
-    return build_raw_packet(0x0C, payload)
+
+
+def _sweep_xy(state: WorldState, x, y, vx, vy, width, height):
+    # move a width x height box by (vx, vy), X first, stopping at solid tiles
+    new_x = x + vx
+    if vx > 0:
+        top = int(y // 16)
+        bottom = int((y + height - 1) // 16)
+        start_tx = int((x + width - 1) // 16) + 1
+        end_tx = int((new_x + width - 1) // 16)
+        for tx in range(start_tx, end_tx + 1):
+            if state.column_solid(tx, top, bottom):
+                new_x = tx * 16 - width
+                vx = 0.0
+                break
+    elif vx < 0:
+        top = int(y // 16)
+        bottom = int((y + height - 1) // 16)
+        start_tx = int(x // 16) - 1
+        end_tx = int(new_x // 16)
+        for tx in range(start_tx, end_tx - 1, -1):
+            if state.column_solid(tx, top, bottom):
+                new_x = (tx + 1) * 16
+                vx = 0.0
+                break
+    x = new_x
+
+    new_y = y + vy
+    on_ground = False
+    if vy > 0:
+        left = int(x // 16)
+        right = int((x + width - 1) // 16)
+        start_ty = int((y + height - 1) // 16) + 1
+        end_ty = int((new_y + height - 1) // 16)
+        for ty in range(start_ty, end_ty + 1):
+            if state.row_solid(ty, left, right):
+                new_y = ty * 16 - height
+                vy = 0.0
+                on_ground = True
+                break
+    elif vy < 0:
+        left = int(x // 16)
+        right = int((x + width - 1) // 16)
+        start_ty = int(y // 16) - 1
+        end_ty = int(new_y // 16)
+        for ty in range(start_ty, end_ty - 1, -1):
+            if state.row_solid(ty, left, right):
+                new_y = (ty + 1) * 16
+                vy = 0.0
+                break
+    return x, new_y, vx, vy, on_ground
+
+
+if njit is not None:
+
+    @njit(cache=True, boundscheck=False)
+    def _solid_jit(grid, grid_w, grid_h, tx, ty):
+        if tx < 0 or ty < 0 or tx >= grid_w or ty >= grid_h:
+            return False
+        return grid[ty * grid_w + tx] != EMPTY_TILE
+
+    @njit(cache=True, boundscheck=False)
+    def _sweep_xy_jit(grid, grid_w, grid_h, x, y, vx, vy, width, height):
+        # same sweep as _sweep_xy over a uint16 view of WorldState.tiles
+        new_x = x + vx
+        if vx > 0:
+            top = int(y // 16)
+            bottom = int((y + height - 1) // 16)
+            end_tx = int((new_x + width - 1) // 16)
+            tx = int((x + width - 1) // 16) + 1
+            hit = False
+            while tx <= end_tx and not hit:
+                for ty in range(top, bottom + 1):
+                    if _solid_jit(grid, grid_w, grid_h, tx, ty):
+                        new_x = tx * 16.0 - width
+                        vx = 0.0
+                        hit = True
+                        break
+                tx += 1
+        elif vx < 0:
+            top = int(y // 16)
+            bottom = int((y + height - 1) // 16)
+            end_tx = int(new_x // 16)
+            tx = int(x // 16) - 1
+            hit = False
+            while tx >= end_tx and not hit:
+                for ty in range(top, bottom + 1):
+                    if _solid_jit(grid, grid_w, grid_h, tx, ty):
+                        new_x = (tx + 1) * 16.0
+                        vx = 0.0
+                        hit = True
+                        break
+                tx -= 1
+        x = new_x
+
+        new_y = y + vy
+        on_ground = False
+        if vy > 0:
+            left = int(x // 16)
+            right = int((x + width - 1) // 16)
+            end_ty = int((new_y + height - 1) // 16)
+            ty = int((y + height - 1) // 16) + 1
+            hit = False
+            while ty <= end_ty and not hit:
+                for tx in range(left, right + 1):
+                    if _solid_jit(grid, grid_w, grid_h, tx, ty):
+                        new_y = ty * 16.0 - height
+                        vy = 0.0
+                        on_ground = True
+                        hit = True
+                        break
+                ty += 1
+        elif vy < 0:
+            left = int(x // 16)
+            right = int((x + width - 1) // 16)
+            end_ty = int(new_y // 16)
+            ty = int(y // 16) - 1
+            hit = False
+            while ty >= end_ty and not hit:
+                for tx in range(left, right + 1):
+                    if _solid_jit(grid, grid_w, grid_h, tx, ty):
+                        new_y = (ty + 1) * 16.0
+                        vy = 0.0
+                        hit = True
+                        break
+                ty -= 1
+        return x, new_y, vx, vy, on_ground
+
+    def _sweep_xy_native(state: WorldState, x, y, vx, vy, width, height):
+        return _sweep_xy_jit(
+            state.grid_view(),
+            state.width,
+            state.height,
+            float(x),
+            float(y),
+            float(vx),
+            float(vy),
+            width,
+            height,
+        )
+
+else:
+    _sweep_xy_native = None
+
+
+def move_with_collision(state: WorldState, x, y, vx, vy, width, height):
+    if _sweep_xy_native is not None:
+        return _sweep_xy_native(state, x, y, vx, vy, width, height)
+    return _sweep_xy(state, x, y, vx, vy, width, height)
+
+
+def warm_native_kernels():
+    # compile (or load the cached builds of) the numba kernels before connecting,
+    # instead of on the first 0x0A / tick while the server is streaming sections
+    if _decode_tiles_native is not None:
+        _decode_tiles_native(TileSection(0, 0, 1, 1), b"\x00", 0, bytes(0x10000))
+    move_with_collision(WorldState(), 0.0, 0.0, 0.0, 0.0, 20, 42)
+
+
+class MessageRouter:
+    # applies polled server messages to the world state and queues the replies
+    # (teleport acks); one dispatch table shared by the tick loops
+    def __init__(
+        self,
+        state: WorldState,
+        profile: VersionSpec,
+        player_slot: int,
+        teleport_tracker: TeleportTracker,
+        tile_frame_important_lut: bytes | None = None,
+    ):
+        self.state = state
+        self.player_slot = player_slot
+        self.teleport_tracker = teleport_tracker
+        if tile_frame_important_lut is None:
+            tile_frame_important_lut = profile.tile_frame_important_lut
+        self.tile_frame_important_lut = tile_frame_important_lut
+        self._server_pos = None
+        # diagnostics from one poll, written out together when it ends
+        self._log = []
+        self._handlers = {
+            0x0A: self._on_tile_section,
+            0x15: self._on_item,
+            0x16: self._on_item_owner,
+            0x97: self._on_item_despawn,
+            0x17: self._on_npc,
+            0x1A: self._on_hurt,
+            0x2C: self._on_death,
+            0x75: self._on_hurt_v2,
+            0x76: self._on_death_v2,
+            0x0D: self._on_player_controls,
+            0x41: self._on_teleport,
+        }
+
+    def set_handler(self, msg_type: int, handler):
+        # handler(payload, outbox); replaces the default for msg_type
+        self._handlers[msg_type] = handler
+
+    def dispatch(self, msg, outbox: list[bytes]):
+        # single-message form of poll, for blocking receive loops
+        self._server_pos = None
+        handler = self._handlers.get(msg.type)
+        if handler is not None:
+            try:
+                handler(msg.payload, outbox)
+            finally:
+                self._flush_log()
+        return self._server_pos
+
+    def poll(self, stream: PacketStream, outbox: list[bytes]):
+        # dispatch everything waiting on the stream; returns our position as last
+        # reported by the server, or None
+        self._server_pos = None
+        handlers = self._handlers
+        player_pos = self.state.player_pos
+        player_slot = self.player_slot
+        # 0x0D is handled inline below unless set_handler replaced it
+        inline_controls = handlers.get(0x0D) == self._on_player_controls
+        try:
+            for msg in stream.iter_messages():
+                msg_type = msg.type
+                if msg_type == 0x0D and inline_controls:
+                    # most of live traffic (every nearby player, every tick);
+                    # same as _on_player_controls without the call
+                    payload = msg.payload
+                    if payload.player_slot == player_slot:
+                        pos = (payload.position_x, payload.position_y)
+                        player_pos[player_slot] = pos
+                        self._server_pos = pos
+                    continue
+                handler = handlers.get(msg_type)
+                if handler is not None:
+                    handler(msg.payload, outbox)
+        finally:
+            self._flush_log()
+        return self._server_pos
+
+    def _flush_log(self):
+        if self._log:
+            sys.stdout.write("\n".join(self._log) + "\n")
+            sys.stdout.flush()
+            self._log.clear()
+
+    def _on_tile_section(self, payload, outbox):
+        try:
+            section = parse_tile_section(payload, self.tile_frame_important_lut)
+            self.state.update_tile_section(section)
+        except Exception as e:
+            self._log.append(f"Tile section parse failed: {e}")
+
+    def _on_item(self, payload, outbox):
+        self.state.update_item(payload)
+
+    def _on_item_owner(self, payload, outbox):
+        # no pickup scan here: the owner change bumps items_version and the
+        # loop's next tick scans once for the whole burst
+        self.state.update_item_owner(payload.item_slot, payload.owner)
+        if payload.owner == self.player_slot:
+            self._log.append(f"Picked up item slot={payload.item_slot}")
+
+    def _on_item_despawn(self, payload, outbox):
+        # a malformed 0x97 comes back as SimpleNamespace(raw=...): skip it
+        item_slot = getattr(payload, "item_slot", None)
+        if item_slot is not None:
+            self.state.remove_item(item_slot)
+
+    def _on_npc(self, payload, outbox):
+        self.state.update_npc(payload)
+
+    def _on_hurt(self, payload, outbox):
+        if payload.player_slot == self.player_slot:
+            self._log.append(
+                f"Took damage: dmg={payload.damage} crit={payload.critical}"
+            )
+
+    def _on_death(self, payload, outbox):
+        if payload.player_slot == self.player_slot:
+            self._log.append(
+                f"Killed: dmg={payload.damage} dir={payload.hit_direction}"
+            )
+
+    def _on_hurt_v2(self, payload, outbox):
+        # player_slot is the first byte: skip other players' hits undecoded
+        if not payload or payload[0] != self.player_slot:
+            return
+        info = decode_player_hurt_v2(payload)
+        self._log.append(
+            f"Took damage(v2): dmg={info.damage} crit={info.crit} pvp={info.pvp} dir={info.hit_dir}"
+        )
+
+    def _on_death_v2(self, payload, outbox):
+        if not payload or payload[0] != self.player_slot:
+            return
+        info = decode_player_death_v2(payload)
+        self._log.append(
+            f"Killed(v2): dmg={info.damage} pvp={info.pvp} dir={info.hit_dir}"
+        )
+
+    def _on_player_controls(self, payload, outbox):
+        # only our own slot is tracked; other players' controls are ignored
+        if payload.player_slot == self.player_slot:
+            pos = (payload.position_x, payload.position_y)
+            self.state.update_player_pos(self.player_slot, *pos)
+            self._server_pos = pos
+
+    def _on_teleport(self, payload, outbox):
+        teleport_tracker = self.teleport_tracker
+        info = decode_teleport(payload)
+        if not info.mode & 1:  # mode 0 or 2 (mode is flags & 3)
+            if teleport_tracker.sent(info.target):
+                self._log.append(
+                    f"Teleport pending: target={info.target} pending={teleport_tracker.status()}"
+                )
+            if info.target == self.player_slot:
+                outbox.append(build_teleport_ack_packet(info.target))
+                if teleport_tracker.ack(info.target):
+                    self._log.append(
+                        f"Teleport acked: target={info.target} pending={teleport_tracker.status()}"
+                    )
+        elif info.mode == 3:
+            if teleport_tracker.ack(info.target):
+                self._log.append(
+                    f"Teleport acked: target={info.target} pending={teleport_tracker.status()}"
+                )
+        if DEBUG:  # raw dump of every 0x41, including other players'
+            self._log.append(
+                "Teleport packet: "
+                f"flags_raw=0x{info.flags_raw:02X} flags={info.flags} "
+                f"target={info.target} pos=({info.x:.2f},{info.y:.2f}) "
+                f"style={info.style} extra={info.extra}"
+            )
 
 
 def move_right_loop(
@@ -733,7 +1644,7 @@ def move_right_loop(
     speed: float,
     toggle: bool,
     toggle_interval: float,
-    tile_frame_important: set[int],
+    tile_frame_important_lut: bytes,
     use_physics: bool = True,
     teleport_tracker: TeleportTracker | None = None,
     inventory: InventoryState | None = None,
@@ -741,14 +1652,12 @@ def move_right_loop(
     pickup_radius: float | None = None,
 ):
     tick = 1.0 / 60.0
-    end_time = time.time() + seconds if seconds > 0 else None
     x = start_x
     y = start_y
     vx = 0.0
     vy = 0.0
     on_ground = False
     moving = True
-    next_toggle = time.time() + toggle_interval
     max_run = speed / 60.0  # speed is px/sec
     accel = 0.1
     friction = 0.05
@@ -762,92 +1671,31 @@ def move_right_loop(
     if inventory is None:
         inventory = InventoryState(59)
 
+    router = MessageRouter(
+        state,
+        profile,
+        player_slot,
+        teleport_tracker,
+        tile_frame_important_lut=tile_frame_important_lut,
+    )
+    last_scan = None  # (items_version, x, y) of the last tick pickup scan
+    # the first call JIT-compiles the native sweep; pay that before ticking
+    move_with_collision(state, x, y, 0.0, 0.0, player_width, player_height)
+    end_time = time.monotonic() + seconds if seconds > 0 else None
+    next_toggle = time.monotonic() + toggle_interval
+    next_tick = time.monotonic()
     while True:
-        now = time.time()
+        now = time.monotonic()
         if end_time is not None and now >= end_time:
             break
 
+        # everything sent during this tick goes out in one batch at the end
+        outbox = []
+
         # update last known position from server if available
-        for msg in stream.poll_messages():
-            if msg.type == 0x0A:
-                try:
-                    section = parse_tile_section(msg.payload, tile_frame_important)
-                    state.update_tile_section(section)
-                except Exception as e:
-                    print(f"Tile section parse failed: {e}")
-            elif msg.type == 0x15:
-                state.update_item(msg.payload)
-            elif msg.type == 0x16:
-                state.update_item_owner(msg.payload.item_slot, msg.payload.owner)
-                if msg.payload.owner == player_slot:
-                    print(f"Picked up item slot={msg.payload.item_slot}")
-                if auto_pickup:
-                    try_pickup_reserved_items(
-                        sock,
-                        state,
-                        inventory,
-                        profile,
-                        player_slot,
-                        state.player_pos.get(player_slot) or (x, y),
-                        radius_px=pickup_radius,
-                    )
-            elif msg.type == 0x97:
-                item_slot = getattr(msg.payload, "item_slot", None)
-                if item_slot is None and isinstance(msg.payload, (bytes, bytearray)):
-                    if len(msg.payload) >= 2:
-                        item_slot = struct.unpack("<h", msg.payload[:2])[0]
-                if item_slot is not None:
-                    state.remove_item(item_slot)
-            elif msg.type == 0x17:
-                state.update_npc(msg.payload)
-            elif msg.type == 0x1A and msg.payload.player_slot == player_slot:
-                print(
-                    f"Took damage: dmg={msg.payload.damage} crit={msg.payload.critical}"
-                )
-            elif msg.type == 0x2C and msg.payload.player_slot == player_slot:
-                print(
-                    f"Killed: dmg={msg.payload.damage} dir={msg.payload.hit_direction}"
-                )
-            elif msg.type == 0x75:
-                info = decode_player_hurt_v2(msg.payload)
-                if info["player_slot"] == player_slot:
-                    print(
-                        f"Took damage(v2): dmg={info['damage']} crit={info['crit']} pvp={info['pvp']} dir={info['hit_dir']}"
-                    )
-            elif msg.type == 0x76:
-                info = decode_player_death_v2(msg.payload)
-                if info["player_slot"] == player_slot:
-                    print(
-                        f"Killed(v2): dmg={info['damage']} pvp={info['pvp']} dir={info['hit_dir']}"
-                    )
-            elif msg.type == 0x0D and msg.payload.player_slot == player_slot:
-                x = msg.payload.position_x
-                y = msg.payload.position_y
-                state.update_player_pos(player_slot, x, y)
-            elif msg.type == 0x41:
-                info = decode_teleport(msg.payload)
-                if info["mode"] in (0, 2):
-                    if teleport_tracker.sent(info["target"]):
-                        print(
-                            f"Teleport pending: target={info['target']} pending={teleport_tracker.status()}"
-                        )
-                    if info["target"] == player_slot:
-                        send_raw(sock, build_teleport_ack_packet(info["target"]))
-                        if teleport_tracker.ack(info["target"]):
-                            print(
-                                f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                            )
-                elif info["mode"] == 3:
-                    if teleport_tracker.ack(info["target"]):
-                        print(
-                            f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                        )
-                print(
-                    "Teleport packet: "
-                    f"flags_raw=0x{info['flags_raw']:02X} flags={info['flags']} "
-                    f"target={info['target']} pos=({info['x']:.2f},{info['y']:.2f}) "
-                    f"style={info['style']} extra={info['extra']}"
-                )
+        server_pos = router.poll(stream, outbox)
+        if server_pos is not None:
+            x, y = server_pos
 
         if toggle and now >= next_toggle:
             moving = not moving
@@ -864,106 +1712,52 @@ def move_right_loop(
                     vx = min(0.0, vx + friction)
             vy = min(max_fall, vy + gravity)
 
-            # move X with collision
-            new_x = x + vx
-            if vx > 0:
-                top = int(y // 16)
-                bottom = int((y + player_height - 1) // 16)
-                start_tx = int((x + player_width - 1) // 16) + 1
-                end_tx = int((new_x + player_width - 1) // 16)
-                collided = False
-                for tx in range(start_tx, end_tx + 1):
-                    for ty in range(top, bottom + 1):
-                        if state.is_solid(tx, ty):
-                            new_x = tx * 16 - player_width
-                            vx = 0.0
-                            collided = True
-                            break
-                    if collided:
-                        break
-            elif vx < 0:
-                top = int(y // 16)
-                bottom = int((y + player_height - 1) // 16)
-                start_tx = int(x // 16) - 1
-                end_tx = int(new_x // 16)
-                collided = False
-                for tx in range(start_tx, end_tx - 1, -1):
-                    for ty in range(top, bottom + 1):
-                        if state.is_solid(tx, ty):
-                            new_x = (tx + 1) * 16
-                            vx = 0.0
-                            collided = True
-                            break
-                    if collided:
-                        break
-            x = new_x
-
-            # move Y with collision
-            new_y = y + vy
-            on_ground = False
-            if vy > 0:
-                left = int(x // 16)
-                right = int((x + player_width - 1) // 16)
-                start_ty = int((y + player_height - 1) // 16) + 1
-                end_ty = int((new_y + player_height - 1) // 16)
-                collided = False
-                for ty in range(start_ty, end_ty + 1):
-                    for tx in range(left, right + 1):
-                        if state.is_solid(tx, ty):
-                            new_y = ty * 16 - player_height
-                            vy = 0.0
-                            on_ground = True
-                            collided = True
-                            break
-                    if collided:
-                        break
-            elif vy < 0:
-                left = int(x // 16)
-                right = int((x + player_width - 1) // 16)
-                start_ty = int(y // 16) - 1
-                end_ty = int(new_y // 16)
-                collided = False
-                for ty in range(start_ty, end_ty - 1, -1):
-                    for tx in range(left, right + 1):
-                        if state.is_solid(tx, ty):
-                            new_y = (ty + 1) * 16
-                            vy = 0.0
-                            collided = True
-                            break
-                    if collided:
-                        break
-            y = new_y
+            # move X then Y with tile collision
+            x, y, vx, vy, on_ground = move_with_collision(
+                state, x, y, vx, vy, player_width, player_height
+            )
         else:
             if moving:
                 x += speed * tick
 
         state.update_player_pos(player_slot, x, y)
 
-        if auto_pickup and inventory and player_slot in state.player_pos:
+        pos = (x, y)  # just stored above; no dict round-trip
+        if auto_pickup and inventory and _pickup_scan_due(state, last_scan, pos):
             try_pickup_reserved_items(
                 sock,
                 state,
                 inventory,
                 profile,
                 player_slot,
-                state.player_pos.get(player_slot),
+                pos,
                 radius_px=pickup_radius,
+                outbox=outbox,
             )
+            last_scan = (state.items_version, pos[0], pos[1])
 
-        packet = build_player_controls_packet(
-            profile,
-            player_slot=player_slot,
-            x=x,
-            y=y,
-            control_right=moving,
-            direction=1,
-            selected_item=0,
-            send_velocity=True,
-            vel_x=vx,
-            vel_y=vy,
+        outbox.append(
+            build_player_controls_packet(
+                profile,
+                player_slot=player_slot,
+                x=x,
+                y=y,
+                control_right=moving,
+                direction=1,
+                selected_item=0,
+                send_velocity=True,
+                vel_x=vx,
+                vel_y=vy,
+            )
         )
-        send_raw(sock, packet)
-        time.sleep(tick)
+        send_raw_batch(sock, outbox)
+        # sleep until the next absolute tick so work time doesn't stretch the period
+        next_tick += tick
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -tick:
+            next_tick = time.monotonic()  # fell behind: resync instead of bursting
 
     # stop movement
     packet = build_player_controls_packet(
@@ -994,125 +1788,63 @@ def idle_loop(
     auto_pickup: bool = True,
     pickup_radius: float | None = None,
 ):
-    last_send = time.time()
+    poll_interval = 0.01
+    last_send = time.monotonic()
     vx = 0.0
     vy = 0.0
     if teleport_tracker is None:
         teleport_tracker = TeleportTracker()
     if inventory is None:
         inventory = InventoryState(59)
+    router = MessageRouter(state, profile, player_slot, teleport_tracker)
+    last_scan = None  # (items_version, x, y) of the last pickup scan
+    next_poll = time.monotonic()
     while True:
-        for msg in stream.poll_messages():
-            if msg.type == 0x0A:
-                try:
-                    section = parse_tile_section(
-                        msg.payload, profile.tile_frame_important
-                    )
-                    state.update_tile_section(section)
-                except Exception as e:
-                    print(f"Tile section parse failed: {e}")
-            elif msg.type == 0x15:
-                state.update_item(msg.payload)
-            elif msg.type == 0x16:
-                state.update_item_owner(msg.payload.item_slot, msg.payload.owner)
-                if msg.payload.owner == player_slot:
-                    print(f"Picked up item slot={msg.payload.item_slot}")
-                if auto_pickup:
-                    try_pickup_reserved_items(
-                        sock,
-                        state,
-                        inventory,
-                        profile,
-                        player_slot,
-                        state.player_pos.get(player_slot) or (x, y),
-                        radius_px=pickup_radius,
-                    )
-            elif msg.type == 0x97:
-                item_slot = getattr(msg.payload, "item_slot", None)
-                if item_slot is None and isinstance(msg.payload, (bytes, bytearray)):
-                    if len(msg.payload) >= 2:
-                        item_slot = struct.unpack("<h", msg.payload[:2])[0]
-                if item_slot is not None:
-                    state.remove_item(item_slot)
-            elif msg.type == 0x17:
-                state.update_npc(msg.payload)
-            elif msg.type == 0x1A and msg.payload.player_slot == player_slot:
-                print(
-                    f"Took damage: dmg={msg.payload.damage} crit={msg.payload.critical}"
-                )
-            elif msg.type == 0x2C and msg.payload.player_slot == player_slot:
-                print(
-                    f"Killed: dmg={msg.payload.damage} dir={msg.payload.hit_direction}"
-                )
-            elif msg.type == 0x75:
-                info = decode_player_hurt_v2(msg.payload)
-                if info["player_slot"] == player_slot:
-                    print(
-                        f"Took damage(v2): dmg={info['damage']} crit={info['crit']} pvp={info['pvp']} dir={info['hit_dir']}"
-                    )
-            elif msg.type == 0x76:
-                info = decode_player_death_v2(msg.payload)
-                if info["player_slot"] == player_slot:
-                    print(
-                        f"Killed(v2): dmg={info['damage']} pvp={info['pvp']} dir={info['hit_dir']}"
-                    )
-            elif msg.type == 0x0D and msg.payload.player_slot == player_slot:
-                x = msg.payload.position_x
-                y = msg.payload.position_y
-                state.update_player_pos(player_slot, x, y)
-            elif msg.type == 0x41:
-                info = decode_teleport(msg.payload)
-                if info["mode"] in (0, 2):
-                    if teleport_tracker.sent(info["target"]):
-                        print(
-                            f"Teleport pending: target={info['target']} pending={teleport_tracker.status()}"
-                        )
-                    if info["target"] == player_slot:
-                        send_raw(sock, build_teleport_ack_packet(info["target"]))
-                        if teleport_tracker.ack(info["target"]):
-                            print(
-                                f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                            )
-                elif info["mode"] == 3:
-                    if teleport_tracker.ack(info["target"]):
-                        print(
-                            f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                        )
-                print(
-                    "Teleport packet: "
-                    f"flags_raw=0x{info['flags_raw']:02X} flags={info['flags']} "
-                    f"target={info['target']} pos=({info['x']:.2f},{info['y']:.2f}) "
-                    f"style={info['style']} extra={info['extra']}"
-                )
+        outbox = []
+        server_pos = router.poll(stream, outbox)
+        if server_pos is not None:
+            x, y = server_pos
+        # one pickup scan per burst of item changes, not one per 0x16
+        pos = state.player_pos.get(player_slot)
+        if auto_pickup and inventory and _pickup_scan_due(state, last_scan, pos):
+            try_pickup_reserved_items(
+                sock,
+                state,
+                inventory,
+                profile,
+                player_slot,
+                pos,
+                radius_px=pickup_radius,
+                outbox=outbox,
+            )
+            last_scan = (state.items_version, pos[0], pos[1])
 
-        now = time.time()
+        now = time.monotonic()
         if interval > 0 and now - last_send >= interval:
             state.update_player_pos(player_slot, x, y)
-            if auto_pickup and inventory and player_slot in state.player_pos:
-                try_pickup_reserved_items(
-                    sock,
-                    state,
-                    inventory,
+            outbox.append(
+                build_player_controls_packet(
                     profile,
-                    player_slot,
-                    state.player_pos.get(player_slot),
-                    radius_px=pickup_radius,
+                    player_slot=player_slot,
+                    x=x,
+                    y=y,
+                    control_right=False,
+                    direction=1,
+                    selected_item=0,
+                    send_velocity=True,
+                    vel_x=vx,
+                    vel_y=vy,
                 )
-            packet = build_player_controls_packet(
-                profile,
-                player_slot=player_slot,
-                x=x,
-                y=y,
-                control_right=False,
-                direction=1,
-                selected_item=0,
-                send_velocity=True,
-                vel_x=vx,
-                vel_y=vy,
             )
-            send_raw(sock, packet)
             last_send = now
-        time.sleep(0.01)
+        if outbox:
+            send_raw_batch(sock, outbox)
+        next_poll += poll_interval
+        delay = next_poll - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_poll = time.monotonic()  # behind schedule: poll again right away
 
 
 def explore_loop(
@@ -1130,7 +1862,7 @@ def explore_loop(
     pickup_radius: float | None = None,
 ):
     tick = 1.0 / 60.0
-    last_decide = 0.0
+    last_decide = float("-inf")  # decide on the first tick
     action = Action()
     x = 0.0
     y = 0.0
@@ -1148,97 +1880,27 @@ def explore_loop(
         teleport_tracker = TeleportTracker()
     if inventory is None:
         inventory = InventoryState(59)
+    router = MessageRouter(state, profile, player_slot, teleport_tracker)
+    last_scan = None  # (items_version, x, y) of the last tick pickup scan
+    # the first call JIT-compiles the native sweep; pay that before ticking
+    move_with_collision(state, x, y, 0.0, 0.0, player_width, player_height)
+    next_tick = time.monotonic()
     while True:
-        for msg in stream.poll_messages():
-            if msg.type == 0x0A:
-                try:
-                    section = parse_tile_section(
-                        msg.payload, profile.tile_frame_important
-                    )
-                    state.update_tile_section(section)
-                except Exception as e:
-                    print(f"Tile section parse failed: {e}")
-            elif msg.type == 0x15:
-                state.update_item(msg.payload)
-            elif msg.type == 0x16:
-                state.update_item_owner(msg.payload.item_slot, msg.payload.owner)
-                if msg.payload.owner == player_slot:
-                    print(f"Picked up item slot={msg.payload.item_slot}")
-                if auto_pickup:
-                    try_pickup_reserved_items(
-                        sock,
-                        state,
-                        inventory,
-                        profile,
-                        player_slot,
-                        state.player_pos.get(player_slot) or (x, y),
-                        radius_px=pickup_radius,
-                    )
-            elif msg.type == 0x97:
-                item_slot = getattr(msg.payload, "item_slot", None)
-                if item_slot is None and isinstance(msg.payload, (bytes, bytearray)):
-                    if len(msg.payload) >= 2:
-                        item_slot = struct.unpack("<h", msg.payload[:2])[0]
-                if item_slot is not None:
-                    state.remove_item(item_slot)
-            elif msg.type == 0x17:
-                state.update_npc(msg.payload)
-            elif msg.type == 0x1A and msg.payload.player_slot == player_slot:
-                print(
-                    f"Took damage: dmg={msg.payload.damage} crit={msg.payload.critical}"
-                )
-            elif msg.type == 0x2C and msg.payload.player_slot == player_slot:
-                print(
-                    f"Killed: dmg={msg.payload.damage} dir={msg.payload.hit_direction}"
-                )
-            elif msg.type == 0x75:
-                info = decode_player_hurt_v2(msg.payload)
-                if info["player_slot"] == player_slot:
-                    print(
-                        f"Took damage(v2): dmg={info['damage']} crit={info['crit']} pvp={info['pvp']} dir={info['hit_dir']}"
-                    )
-            elif msg.type == 0x76:
-                info = decode_player_death_v2(msg.payload)
-                if info["player_slot"] == player_slot:
-                    print(
-                        f"Killed(v2): dmg={info['damage']} pvp={info['pvp']} dir={info['hit_dir']}"
-                    )
-            elif msg.type == 0x0D and msg.payload.player_slot == player_slot:
-                x = msg.payload.position_x
-                y = msg.payload.position_y
-                state.update_player_pos(player_slot, x, y)
-            elif msg.type == 0x41:
-                info = decode_teleport(msg.payload)
-                if info["mode"] in (0, 2):
-                    if teleport_tracker.sent(info["target"]):
-                        print(
-                            f"Teleport pending: target={info['target']} pending={teleport_tracker.status()}"
-                        )
-                    if info["target"] == player_slot:
-                        send_raw(sock, build_teleport_ack_packet(info["target"]))
-                        if teleport_tracker.ack(info["target"]):
-                            print(
-                                f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                            )
-                elif info["mode"] == 3:
-                    if teleport_tracker.ack(info["target"]):
-                        print(
-                            f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                        )
-                print(
-                    "Teleport packet: "
-                    f"flags_raw=0x{info['flags_raw']:02X} flags={info['flags']} "
-                    f"target={info['target']} pos=({info['x']:.2f},{info['y']:.2f}) "
-                    f"style={info['style']} extra={info['extra']}"
-                )
+        outbox = []
+        # everything sent during this tick goes out in one batch at the end
+        server_pos = router.poll(stream, outbox)
+        if server_pos is not None:
+            x, y = server_pos
 
-        now = time.time()
+        now = time.monotonic()
         if interval <= 0 or now - last_decide >= interval:
             pos = state.player_pos.get(player_slot) or (x, y)
             x, y = pos
             obs = Observation(
                 player_pos=pos,
-                nearby_tiles=state.get_nearby_tiles(x, y, radius_tiles=sense_radius),
+                nearby_tiles=state.get_nearby_tile_keys(
+                    x, y, radius_tiles=sense_radius
+                ),
                 nearby_items=state.get_nearby_items(x, y),
                 nearby_npcs=state.get_nearby_npcs(x, y),
             )
@@ -1261,121 +1923,69 @@ def explore_loop(
             on_ground = False
         vy = min(max_fall, vy + gravity)
 
-        # move X with collision
-        new_x = x + vx
-        if vx > 0:
-            top = int(y // 16)
-            bottom = int((y + player_height - 1) // 16)
-            start_tx = int((x + player_width - 1) // 16) + 1
-            end_tx = int((new_x + player_width - 1) // 16)
-            collided = False
-            for tx in range(start_tx, end_tx + 1):
-                for ty in range(top, bottom + 1):
-                    if state.is_solid(tx, ty):
-                        new_x = tx * 16 - player_width
-                        vx = 0.0
-                        collided = True
-                        break
-                if collided:
-                    break
-        elif vx < 0:
-            top = int(y // 16)
-            bottom = int((y + player_height - 1) // 16)
-            start_tx = int(x // 16) - 1
-            end_tx = int(new_x // 16)
-            collided = False
-            for tx in range(start_tx, end_tx - 1, -1):
-                for ty in range(top, bottom + 1):
-                    if state.is_solid(tx, ty):
-                        new_x = (tx + 1) * 16
-                        vx = 0.0
-                        collided = True
-                        break
-                if collided:
-                    break
-        x = new_x
-
-        # move Y with collision
-        new_y = y + vy
-        on_ground = False
-        if vy > 0:
-            left = int(x // 16)
-            right = int((x + player_width - 1) // 16)
-            start_ty = int((y + player_height - 1) // 16) + 1
-            end_ty = int((new_y + player_height - 1) // 16)
-            collided = False
-            for ty in range(start_ty, end_ty + 1):
-                for tx in range(left, right + 1):
-                    if state.is_solid(tx, ty):
-                        new_y = ty * 16 - player_height
-                        vy = 0.0
-                        on_ground = True
-                        collided = True
-                        break
-                if collided:
-                    break
-        elif vy < 0:
-            left = int(x // 16)
-            right = int((x + player_width - 1) // 16)
-            start_ty = int(y // 16) - 1
-            end_ty = int(new_y // 16)
-            collided = False
-            for ty in range(start_ty, end_ty - 1, -1):
-                for tx in range(left, right + 1):
-                    if state.is_solid(tx, ty):
-                        new_y = (ty + 1) * 16
-                        vy = 0.0
-                        collided = True
-                        break
-                if collided:
-                    break
-        y = new_y
+        # move X then Y with tile collision
+        x, y, vx, vy, on_ground = move_with_collision(
+            state, x, y, vx, vy, player_width, player_height
+        )
         state.update_player_pos(player_slot, x, y)
 
-        if auto_pickup and inventory and player_slot in state.player_pos:
+        pos = (x, y)  # just stored above; no dict round-trip
+        if auto_pickup and inventory and _pickup_scan_due(state, last_scan, pos):
             try_pickup_reserved_items(
                 sock,
                 state,
                 inventory,
                 profile,
                 player_slot,
-                state.player_pos.get(player_slot),
+                pos,
                 radius_px=pickup_radius,
+                outbox=outbox,
             )
+            last_scan = (state.items_version, pos[0], pos[1])
 
-        packet = build_player_controls_packet(
-            profile,
-            player_slot=player_slot,
-            x=x,
-            y=y,
-            control_left=action.move_left,
-            control_right=action.move_right,
-            control_jump=action.jump,
-            control_use_item=action.use_item,
-            direction=action.direction,
-            selected_item=action.selected_item,
-            send_velocity=True,
-            vel_x=vx,
-            vel_y=vy,
+        outbox.append(
+            build_player_controls_packet(
+                profile,
+                player_slot=player_slot,
+                x=x,
+                y=y,
+                control_left=action.move_left,
+                control_right=action.move_right,
+                control_jump=action.jump,
+                control_use_item=action.use_item,
+                direction=action.direction,
+                selected_item=action.selected_item,
+                send_velocity=True,
+                vel_x=vx,
+                vel_y=vy,
+            )
         )
-        send_raw(sock, packet)
-        time.sleep(tick)
+        send_raw_batch(sock, outbox)
+        # sleep until the next absolute tick so work time doesn't stretch the period
+        next_tick += tick
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -tick:
+            next_tick = time.monotonic()  # fell behind: resync instead of bursting
 
 
-def send_chat(sock, text: str):
+def build_chat_packet(text: str) -> bytes:
     # NetTextModule client message: module_id + ChatMessage(CommandId + Text)
     # ChatCommandId for SayChatCommand is "Say".
     payload = write_dotnet_string("Say") + write_dotnet_string(text)
-    packet = build_netmodule_packet(NET_TEXT_MODULE_ID, payload)
-    send_raw(sock, packet)
+    return build_netmodule_packet(NET_TEXT_MODULE_ID, payload)
+
+
+def send_chat(sock, text: str):
+    send_raw(sock, build_chat_packet(text))
 
 
 def _pack_color(c: dict) -> bytes:
-    return struct.pack("<BBB", c["r"], c["g"], c["b"])
+    return _COLOR_PACK(c["r"], c["g"], c["b"])
 
 
 def build_sync_player_packet(profile: VersionSpec, payload: dict) -> bytes:
-    fmt = profile.message_formats.get("sync_player", "v0")
     name = payload["name"]
     if len(name) > profile.name_len:
         print(f"Name too long, trimming to {profile.name_len} chars.")
@@ -1388,10 +1998,10 @@ def build_sync_player_packet(profile: VersionSpec, payload: dict) -> bytes:
     base = bytearray()
     base.append(payload["player_id"] & 0xFF)
 
-    if fmt == "v1":
+    if profile.sync_player_v1:
         base.append(payload.get("skin_variant", 0) & 0xFF)
         base.append(payload.get("voice_variant", 1) & 0xFF)
-        base.extend(struct.pack("<f", payload.get("voice_pitch_offset", 0.0)))
+        base.extend(_F32.pack(payload.get("voice_pitch_offset", 0.0)))
         base.append(payload.get("hair", 0) & 0xFF)
     else:
         base.append(payload.get("skin_variant", 0) & 0xFF)
@@ -1399,7 +2009,7 @@ def build_sync_player_packet(profile: VersionSpec, payload: dict) -> bytes:
 
     base.extend(write_dotnet_string(name))
     base.append(payload.get("hair_dye", 0) & 0xFF)
-    base.extend(struct.pack("<H", hide_vis_mask))
+    base.extend(_U16.pack(hide_vis_mask))
     base.append(payload.get("hide_misc", 0) & 0xFF)
     base.extend(_pack_color(payload["hair_color"]))
     base.extend(_pack_color(payload["skin_color"]))
@@ -1416,28 +2026,62 @@ def build_sync_player_packet(profile: VersionSpec, payload: dict) -> bytes:
 
 
 def build_sync_equipment_packet(profile: VersionSpec, payload: dict) -> bytes:
-    fmt = profile.message_formats.get("sync_equipment", "v0")
-    base = bytearray()
-    base.append(payload["player_slot"] & 0xFF)
-    base.extend(struct.pack("<h", payload["inventory_slot"]))
-    base.extend(struct.pack("<h", payload["stack"]))
-    base.append(payload["prefix_id"] & 0xFF)
-    base.extend(struct.pack("<h", payload["item_id"]))
-    if fmt == "v1":
-        base.append(payload.get("flags", 0) & 0xFF)
-    return build_raw_packet(0x05, bytes(base))
+    # whole packet (header included) in one pack: sent once per inventory slot at login
+    args = (
+        payload["player_slot"] & 0xFF,
+        payload["inventory_slot"],
+        payload["stack"],
+        payload["prefix_id"] & 0xFF,
+        payload["item_id"],
+    )
+    if profile.sync_equipment_v1:
+        st = _EQUIP_V1_PACKET
+        return st.pack(st.size, 0x05, *args, payload.get("flags", 0) & 0xFF)
+    st = _EQUIP_V0_PACKET
+    return st.pack(st.size, 0x05, *args)
+
+
+def build_player_life_packet(
+    player_slot: int, current_health: int, max_health: int
+) -> bytes:
+    st = _SLOT_STAT_PACKET
+    return st.pack(st.size, 0x10, player_slot, current_health, max_health)
+
+
+def build_player_mana_packet(player_slot: int, mana: int, max_mana: int) -> bytes:
+    st = _SLOT_STAT_PACKET
+    return st.pack(st.size, 0x2A, player_slot, mana, max_mana)
+
+
+def build_loadout_packet(loadout) -> bytes:
+    st = _LOADOUT_PACKET
+    return st.pack(st.size, 0x93, *loadout)
 
 
 def build_teleport_ack_packet(target: int) -> bytes:
     # NetMessage.TrySendData(65, ..., number=3, number2=target)
     bits = 0x01 | 0x02
-    payload = struct.pack("<BhffB", bits, target, 0.0, 0.0, 0)
-    return build_raw_packet(0x41, payload)
+    st = _TELEPORT_ACK_PACKET
+    return st.pack(st.size, 0x41, bits, target, 0.0, 0.0, 0)
 
 
 def build_remove_item_packet(item_slot: int) -> bytes:
-    payload = struct.pack("<h", item_slot)
-    return build_raw_packet(0x97, payload)
+    st = _REMOVE_ITEM_PACKET
+    return st.pack(st.size, 0x97, item_slot)
+
+
+def _pickup_scan_due(state: WorldState, last_scan, pos) -> bool:
+    # a scan can only find something new after an item change or a move
+    if pos is None:
+        return False
+    if last_scan is None:
+        return True
+    version, sx, sy = last_scan
+    if version != state.items_version:
+        return True
+    dx = pos[0] - sx
+    dy = pos[1] - sy
+    return dx * dx + dy * dy >= PICKUP_RESCAN_PX * PICKUP_RESCAN_PX
 
 
 def try_pickup_reserved_items(
@@ -1448,23 +2092,21 @@ def try_pickup_reserved_items(
     player_slot: int,
     player_pos: tuple[float, float] | None,
     radius_px: float | None = None,
+    outbox: list[bytes] | None = None,
 ):
+    # packets go to the caller's outbox if given, otherwise one batch at the end
     if player_pos is None:
         return
+    packets = [] if outbox is None else outbox
     px, py = player_pos
-    r2 = None if radius_px is None or radius_px < 0 else radius_px * radius_px
-    # iterate over a snapshot to allow deletion
-    for item_slot, item in list(state.items.items()):
-        owner = getattr(item, "owner", None)
-        if owner != player_slot:
-            continue
-        try:
-            dx = item.position_x - px
-            dy = item.position_y - py
-        except Exception:
-            continue
-        if r2 is not None and dx * dx + dy * dy > r2:
-            continue
+    # only items reserved for us (owner index; the lists are snapshots so
+    # removal while iterating is safe)
+    if radius_px is None or radius_px < 0:
+        reserved = state.items_owned_by(player_slot)
+    else:
+        reserved = state.nearby_items_owned_by(player_slot, px, py, radius_px)
+    for item in reserved:
+        item_slot = item.item_slot
         item_id = getattr(item, "item_id", 0)
         stack = getattr(item, "stack", 0)
         prefix_id = getattr(item, "prefix_id", 0)
@@ -1472,10 +2114,9 @@ def try_pickup_reserved_items(
             continue
         slot = inventory.find_empty_slot()
         if slot is None:
-            return
+            break
         # update inventory on server
-        send_raw(
-            sock,
+        packets.append(
             build_sync_equipment_packet(
                 profile,
                 {
@@ -1490,33 +2131,63 @@ def try_pickup_reserved_items(
         )
         inventory.set_slot(slot, item_id, stack, prefix_id)
         # remove world item
-        send_raw(sock, build_remove_item_packet(item_slot))
-        if item_slot in state.items:
-            del state.items[item_slot]
+        packets.append(build_remove_item_packet(item_slot))
+        state.remove_item(item_slot)
+    if outbox is None and packets:
+        send_raw_batch(sock, packets)
 
 
 def build_player_buffs_packet(
     profile: VersionSpec, player_slot: int, buffs=None
 ) -> bytes:
-    fmt = profile.message_formats.get("player_buffs", "v0")
     base = bytearray()
     base.append(player_slot & 0xFF)
-    if fmt == "v1":
+    if profile.player_buffs_v1:
         # v1: sequence of UInt16 buff IDs terminated by 0
         buffs = buffs or []
-        for buff_id in buffs:
-            base.extend(struct.pack("<H", buff_id))
-        base.extend(struct.pack("<H", 0))
+        base.extend(b"".join(map(_U16.pack, buffs)))
+        base.extend(_U16.pack(0))
     else:
         # v0: fixed-size array (default 44)
         if buffs is None:
             buffs = [0] * 44
-        for buff_id in buffs:
-            base.extend(struct.pack("<H", buff_id))
+        base.extend(b"".join(map(_U16.pack, buffs)))
     return build_raw_packet(0x32, bytes(base))
 
 
 class TerrariaClient:
+    __slots__ = (
+        "host",
+        "port",
+        "password",
+        "name",
+        "chat_text",
+        "uuid",
+        "profile",
+        "inventory_count",
+        "worldinfo_retry",
+        "auto_pickup",
+        "pickup_radius",
+        # post-login behaviour, set from the CLI flags
+        "move_right",
+        "move_seconds",
+        "move_speed",
+        "move_toggle",
+        "move_toggle_interval",
+        "explore",
+        "explore_left",
+        "explore_interval",
+        "explore_radius",
+        "use_physics",
+        "stay_connected",
+        "idle_interval",
+        "dump_state",
+        "dump_path",
+        "dump_radius",
+        "sense",
+        "sense_radius",
+    )
+
     def __init__(
         self,
         host: str,
@@ -1545,9 +2216,35 @@ class TerrariaClient:
         self.worldinfo_retry = worldinfo_retry
         self.auto_pickup = auto_pickup
         self.pickup_radius = pickup_radius
+        # post-login behaviour (defaults match the CLI's)
+        self.move_right = False
+        self.move_seconds = 5.0
+        self.move_speed = 64.0
+        self.move_toggle = False
+        self.move_toggle_interval = 0.5
+        self.explore = False
+        self.explore_left = False
+        self.explore_interval = 0.1
+        self.explore_radius = 6
+        self.use_physics = True
+        self.stay_connected = False
+        self.idle_interval = 0.25
+        self.dump_state = False
+        self.dump_path = "data/state_dump.json"
+        self.dump_radius = 10
+        self.sense = False
+        self.sense_radius = 5
 
     def login(self):
+        warm_native_kernels()
         with socket.create_connection((self.host, self.port)) as s:
+            # small control packets go out immediately instead of waiting on Nagle
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # send/recv buffers stay at the kernel default: setting them pins the
+            # size (clamped to rmem_max/wmem_max) and disables Linux autotuning
+            # idle_loop with interval <= 0 never sends; let the kernel notice a
+            # dead server instead of blocking on it forever
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             stream = PacketStream(s)
             state = WorldState()
             teleport_tracker = TeleportTracker()
@@ -1594,35 +2291,27 @@ class TerrariaClient:
                 "torch_flags": 24,
                 "shimmer_flags": 0,
             }
-            send_raw(s, build_sync_player_packet(profile, sync_player_payload))
+            # 승인 이후 $06까지는 응답을 기다리지 않으므로 전부 모아 한 번에 전송 (파이프라이닝)
+            handshake = [build_sync_player_packet(profile, sync_player_payload)]
             print("Player Appearance")
 
             # send client uuid
-            send(s, 0x44, {"client_uuid": self.uuid})
+            handshake.append(build_packet(0x44, {"client_uuid": self.uuid}))
 
             # $10 Life, $2A Mana, $32 Buffs (응답 기다리지 않고 전송) (https://seancode.com/terrafirma/net.html)
-            send(
-                s,
-                0x10,
-                {"player_slot": player_slot, "current_health": 500, "max_health": 500},
-            )
-            send(
-                s,
-                0x2A,
-                {"player_slot": player_slot, "mana": 200, "max_mana": 200},
-            )
-            send_raw(
-                s, build_player_buffs_packet(profile, player_slot=player_slot, buffs=[])
+            handshake.append(build_player_life_packet(player_slot, 500, 500))
+            handshake.append(build_player_mana_packet(player_slot, 200, 200))
+            handshake.append(
+                build_player_buffs_packet(profile, player_slot=player_slot, buffs=[])
             )
             print("Life, Mana, Buffs")
 
             # Loadout (0x93 == 147)
-            send(s, 0x93, {"loadout": [0, 0, 0, 0]})
+            handshake.append(build_loadout_packet((0, 0, 0, 0)))
 
             # 인벤토리 슬롯 0..72, $05 반복 전송 (https://seancode.com/terrafirma/net.html)
             for inv in range(self.inventory_count):
-                send_raw(
-                    s,
+                handshake.append(
                     build_sync_equipment_packet(
                         profile,
                         {
@@ -1633,13 +2322,14 @@ class TerrariaClient:
                             "item_id": 0,
                             "flags": 0,
                         },
-                    ),
+                    )
                 )
                 inventory.set_slot(inv, 0, 0, 0)
 
             print("Sent Inventory")
             # $06 World Info 요청 (https://seancode.com/terrafirma/net.html)
-            send(s, 0x06)
+            handshake.append(REQUEST_WORLD_INFO_PACKET)
+            send_raw_batch(s, handshake)
             print("World Info Requested")
             # 서버는 문제 있으면 $02로 킥. 정상이면 $07 응답 후 Initialized(2)로 승격 (https://seancode.com/terrafirma/net.html)
             world_info = None
@@ -1653,7 +2343,7 @@ class TerrariaClient:
                         and time.time() - last_worldinfo_send > self.worldinfo_retry
                     ):
                         print("Re-sending World Info request...")
-                        send(s, 0x06)
+                        send_raw(s, REQUEST_WORLD_INFO_PACKET)
                         last_worldinfo_send = time.time()
                     if DEBUG and time.time() >= warn_at:
                         print("Still waiting for world info...")
@@ -1669,6 +2359,7 @@ class TerrariaClient:
                     if msg.type != 0x52:
                         print(f"World Info Other response: {msg}")
             print(f"World Info Response: {world_info}")
+            state.allocate_tiles(world_info.max_tiles_x, world_info.max_tiles_y)
             fallback_pos = (
                 world_info.spawn_tile_x * 16.0,
                 world_info.spawn_tile_y * 16.0,
@@ -1685,98 +2376,57 @@ class TerrariaClient:
             )
 
             # 서버는 $09, 여러 개의 $0A, $0B, $15, $16, $17, $31, $39, $38 순으로 보냄 (https://seancode.com/terrafirma/net.html)
+            # 타일 섹션은 워커 스레드에서 압축 해제/파싱 (zlib, numba 커널 모두 GIL을 놓음), 수신은 계속 진행
+            tile_pool = ThreadPoolExecutor(max_workers=TILE_WORKERS)
+            pending_sections = deque()
             got_spawn = False
-            while not got_spawn:
-                msg = stream.recv_message()
-                if msg.type == 0x0A:  # Tile section
-                    try:
-                        section = parse_tile_section(
-                            msg.payload, profile.tile_frame_important
-                        )
-                        state.update_tile_section(section)
-                    except Exception as e:
-                        print(f"Tile section parse failed: {e}")
-                elif msg.type == 0x15:
-                    state.update_item(msg.payload)
-                elif msg.type == 0x16:
-                    state.update_item_owner(msg.payload.item_slot, msg.payload.owner)
-                    if msg.payload.owner == player_slot:
-                        print(f"Picked up item slot={msg.payload.item_slot}")
-                    if self.auto_pickup:
+
+            def on_tile_section(payload, outbox):
+                pending_sections.append(
+                    tile_pool.submit(
+                        parse_tile_section,
+                        payload,
+                        profile.tile_frame_important_lut,
+                    )
+                )
+
+            def on_spawn(payload, outbox):  # InitialSpawn / PlayerSpawn
+                nonlocal got_spawn
+                got_spawn = True
+
+            # same handlers as the tick loops, except that tile sections go to
+            # the pool and the spawn message ends this phase
+            try:
+                router = MessageRouter(state, profile, player_slot, teleport_tracker)
+                router.set_handler(0x0A, on_tile_section)
+                router.set_handler(0x31, on_spawn)
+                router.set_handler(0x0C, on_spawn)
+                outbox = []
+                last_scan = None  # (items_version, x, y) of the last pickup scan
+                while not got_spawn:
+                    router.dispatch(stream.recv_message(), outbox)
+                    if outbox:
+                        send_raw_batch(s, outbox)
+                        outbox.clear()
+                    pos = state.player_pos.get(player_slot) or fallback_pos
+                    if self.auto_pickup and _pickup_scan_due(state, last_scan, pos):
                         try_pickup_reserved_items(
                             s,
                             state,
                             inventory,
                             profile,
                             player_slot,
-                            state.player_pos.get(player_slot) or fallback_pos,
+                            pos,
                             radius_px=self.pickup_radius,
                         )
-                elif msg.type == 0x97:
-                    item_slot = getattr(msg.payload, "item_slot", None)
-                    if item_slot is None and isinstance(
-                        msg.payload, (bytes, bytearray)
-                    ):
-                        if len(msg.payload) >= 2:
-                            item_slot = struct.unpack("<h", msg.payload[:2])[0]
-                    if item_slot is not None:
-                        state.remove_item(item_slot)
-                elif msg.type == 0x17:
-                    state.update_npc(msg.payload)
-                elif msg.type == 0x1A and msg.payload.player_slot == player_slot:
-                    print(
-                        f"Took damage: dmg={msg.payload.damage} crit={msg.payload.critical}"
-                    )
-                elif msg.type == 0x2C and msg.payload.player_slot == player_slot:
-                    print(
-                        f"Killed: dmg={msg.payload.damage} dir={msg.payload.hit_direction}"
-                    )
-                elif msg.type == 0x75:
-                    info = decode_player_hurt_v2(msg.payload)
-                    if info["player_slot"] == player_slot:
-                        print(
-                            f"Took damage(v2): dmg={info['damage']} crit={info['crit']} pvp={info['pvp']} dir={info['hit_dir']}"
-                        )
-                elif msg.type == 0x76:
-                    info = decode_player_death_v2(msg.payload)
-                    if info["player_slot"] == player_slot:
-                        print(
-                            f"Killed(v2): dmg={info['damage']} pvp={info['pvp']} dir={info['hit_dir']}"
-                        )
-                elif msg.type == 0x0D:
-                    state.update_player_pos(
-                        msg.payload.player_slot,
-                        msg.payload.position_x,
-                        msg.payload.position_y,
-                    )
-                elif msg.type == 0x41:
-                    info = decode_teleport(msg.payload)
-                    if info["mode"] in (0, 2):
-                        if teleport_tracker.sent(info["target"]):
-                            print(
-                                f"Teleport pending: target={info['target']} pending={teleport_tracker.status()}"
-                            )
-                        if info["target"] == player_slot:
-                            send_raw(s, build_teleport_ack_packet(info["target"]))
-                            if teleport_tracker.ack(info["target"]):
-                                print(
-                                    f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                                )
-                    elif info["mode"] == 3:
-                        if teleport_tracker.ack(info["target"]):
-                            print(
-                                f"Teleport acked: target={info['target']} pending={teleport_tracker.status()}"
-                            )
-                    print(
-                        "Teleport packet: "
-                        f"flags_raw=0x{info['flags_raw']:02X} flags={info['flags']} "
-                        f"target={info['target']} pos=({info['x']:.2f},{info['y']:.2f}) "
-                        f"style={info['style']} extra={info['extra']}"
-                    )
-                elif msg.type in (0x31, 0x0C):  # InitialSpawn / PlayerSpawn
-                    got_spawn = True
-                # 필요시 각 타입 처리:
-                # 0x09 status, 0x0A tile rows, 0x0B recalc UV, 0x15/0x16 items, 0x17 NPCs, 0x39 balance, 0x38 named NPCs
+                        last_scan = (state.items_version, pos[0], pos[1])
+                    # 필요시 각 타입 처리:
+                    # 0x09 status, 0x0A tile rows, 0x0B recalc UV, 0x15/0x16 items, 0x17 NPCs, 0x39 balance, 0x38 named NPCs
+                    apply_tile_sections(state, pending_sections)
+                apply_tile_sections(state, pending_sections, wait=True)
+            finally:
+                # also on errors/timeouts, so the worker threads never outlive login
+                tile_pool.shutdown(cancel_futures=True)
 
             # $0C Player Spawn 전송 → 상태 Playing(10)
             spawn_packet = build_spawn_packet(
@@ -1790,21 +2440,19 @@ class TerrariaClient:
                 team=0,
                 spawn_context=0,
             )
-            send_raw(s, spawn_packet)
-
             # 이후 자유롭게 양방향 메시지 교환 가능
-            # 예: 채팅 (NetModules/NetTextModule)
-            send_chat(s, self.chat_text)
+            # 예: 채팅 (NetModules/NetTextModule) - 스폰과 한 번에 전송
+            send_raw_batch(s, [spawn_packet, build_chat_packet(self.chat_text)])
             print(f"Chat sent: {self.chat_text}")
             print(
                 f"Tiles loaded: {state.tile_sections}, entities: items={len(state.items)} npcs={len(state.npcs)}"
             )
 
             # 간단한 이동 AI: 오른쪽으로만 이동
-            if getattr(self, "explore", False):
+            if self.explore:
                 bot = ExplorationBot(
                     ExplorationConfig(
-                        prefer_right=not getattr(self, "explore_left", False),
+                        prefer_right=not self.explore_left,
                         jump_if_blocked=True,
                     )
                 )
@@ -1822,7 +2470,7 @@ class TerrariaClient:
                     auto_pickup=self.auto_pickup,
                     pickup_radius=self.pickup_radius,
                 )
-            elif getattr(self, "move_right", False):
+            elif self.move_right:
                 start_x = world_info.spawn_tile_x * 16.0
                 start_y = world_info.spawn_tile_y * 16.0
                 time.sleep(0.5)
@@ -1838,7 +2486,7 @@ class TerrariaClient:
                     speed=self.move_speed,
                     toggle=self.move_toggle,
                     toggle_interval=self.move_toggle_interval,
-                    tile_frame_important=profile.tile_frame_important,
+                    tile_frame_important_lut=profile.tile_frame_important_lut,
                     use_physics=self.use_physics,
                     teleport_tracker=teleport_tracker,
                     inventory=inventory,
@@ -1860,13 +2508,13 @@ class TerrariaClient:
                     radius_px=self.pickup_radius,
                 )
 
-            if getattr(self, "sense", False):
+            if self.sense:
                 tiles = state.get_nearby_tiles(x, y, radius_tiles=self.sense_radius)
                 items = state.get_nearby_items(x, y)
                 npcs = state.get_nearby_npcs(x, y)
                 print(f"Sense: tiles={len(tiles)} items={len(items)} npcs={len(npcs)}")
 
-            if getattr(self, "dump_state", False):
+            if self.dump_state:
                 dump_state(
                     state,
                     Path(self.dump_path),
@@ -1874,7 +2522,7 @@ class TerrariaClient:
                     radius_tiles=self.dump_radius,
                 )
 
-            if getattr(self, "stay_connected", False):
+            if self.stay_connected:
                 idle_loop(
                     s,
                     stream,
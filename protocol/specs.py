@@ -1,6 +1,10 @@
+import functools
+import itertools
 import json
+import mmap
+import os
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
@@ -11,45 +15,95 @@ class VersionSpec:
     base_dir: Path
     decomp_dir: Path
     version_string: str
-    tile_frame_important: set[int]
+    tile_frame_important: frozenset[int]
     name_len: int
     message_formats: dict
+    # tile_type -> 1 if frame-important, indexed directly by the tile decoder
+    tile_frame_important_lut: bytes = field(init=False, repr=False)
+    # message_formats resolved once (with each builder's default) so packet
+    # builders test a bool instead of a dict lookup + string compare per call
+    controls_v0: bool = field(init=False, repr=False)
+    spawn_v0: bool = field(init=False, repr=False)
+    sync_player_v1: bool = field(init=False, repr=False)
+    sync_equipment_v1: bool = field(init=False, repr=False)
+    player_buffs_v1: bool = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "tile_frame_important_lut",
+            _tile_frame_important_lut(self.tile_frame_important),
+        )
+        formats = self.message_formats
+        for attr, key, default, value in (
+            ("controls_v0", "player_controls", "v1", "v0"),
+            ("spawn_v0", "player_spawn", "v1", "v0"),
+            ("sync_player_v1", "sync_player", "v0", "v1"),
+            ("sync_equipment_v1", "sync_equipment", "v0", "v1"),
+            ("player_buffs_v1", "player_buffs", "v0", "v1"),
+        ):
+            object.__setattr__(self, attr, formats.get(key, default) == value)
 
 
 def _read_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
+# decompiled sources are large; match on raw bytes (no unicode decode)
+_VERSION_RE = re.compile(rb'writer\.Write\("Terraria" \+ (\d+)\)')
+_TILE_FRAME_IMPORTANT_RE = re.compile(rb"tileFrameImportant\[(\d+)\] = true;")
+
+
+def _source_matches(path: Path, pattern, limit: Optional[int] = None) -> list:
+    # group(1) of up to limit matches; the file is mmapped and scanned in place
+    # instead of being read into a (several MB) bytes object
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []  # mmap refuses empty files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            matches = itertools.islice(pattern.finditer(mm), limit)
+            return [m.group(1) for m in matches]
+
+
+@functools.lru_cache(maxsize=8)
 def _infer_version_string(decomp_dir: Path) -> Optional[str]:
     netmessage = decomp_dir / "Terraria" / "NetMessage.cs"
     if not netmessage.exists():
         return None
-    text = netmessage.read_text(encoding="utf-8", errors="ignore")
-    m = re.search(r"writer\\.Write\\(\"Terraria\" \\+ (\\d+)\\)", text)
-    if not m:
+    found = _source_matches(netmessage, _VERSION_RE, limit=1)
+    if not found:
         return None
-    return f"Terraria{m.group(1)}"
+    return f"Terraria{int(found[0])}"
+
 
+def _tile_frame_important_lut(ids: frozenset[int]) -> bytes:
+    # covers every uint16 tile type so lookups need no bounds check;
+    # empty when the list is missing (parse_tile_section skips tiles then)
+    if not ids:
+        return b""
+    lut = bytearray(0x10000)
+    for tile_type in ids:
+        lut[tile_type] = 1
+    return bytes(lut)
 
+
+@functools.lru_cache(maxsize=8)
 def _load_tile_frame_important(
     profile_name: str, decomp_dir: Path, data_dir: Path
-) -> set[int]:
+) -> frozenset[int]:
+    # cached per process; frozen because every spec for the profile shares it
     cache_path = data_dir / f"tile_frame_important_{profile_name}.txt"
     if cache_path.exists():
         text = cache_path.read_text(encoding="utf-8", errors="ignore")
-        ids = {
+        ids = frozenset(
             int(line.strip()) for line in text.splitlines() if line.strip().isdigit()
-        }
+        )
         if ids:
             return ids
 
     main_cs = decomp_dir / "Terraria" / "Main.cs"
     if main_cs.exists():
-        text = main_cs.read_text(encoding="utf-8", errors="ignore")
-        ids = {
-            int(m.group(1))
-            for m in re.finditer(r"tileFrameImportant\\[(\\d+)\\] = true;", text)
-        }
+        ids = frozenset(map(int, _source_matches(main_cs, _TILE_FRAME_IMPORTANT_RE)))
         if ids:
             data_dir.mkdir(exist_ok=True)
             cache_path.write_text(
@@ -57,9 +111,26 @@ def _load_tile_frame_important(
             )
             return ids
 
-    return set()
+    return frozenset()
+
+
+def _find_decomp_dir(base_dir: Path) -> Optional[Path]:
+    # try to find a decompiled dir within base_dir; scandir's d_type lets plain
+    # files be skipped without probing for Terraria/NetMessage.cs under them
+    try:
+        entries = os.scandir(base_dir)
+    except OSError:
+        return None
+    with entries:
+        for entry in entries:
+            if entry.is_dir() and os.path.isfile(
+                os.path.join(entry.path, "Terraria", "NetMessage.cs")
+            ):
+                return Path(entry.path)
+    return None
 
 
+@functools.lru_cache(maxsize=4)
 def resolve_spec(
     profile_name: str,
     repo_root: Path,
@@ -83,11 +154,7 @@ def resolve_spec(
         if decomp_hint:
             decomp_dir = base_dir / decomp_hint
         else:
-            # try to find a decompiled dir within base_dir
-            for p in base_dir.glob("*"):
-                if (p / "Terraria" / "NetMessage.cs").exists():
-                    decomp_dir = p
-                    break
+            decomp_dir = _find_decomp_dir(base_dir)
 
     if decomp_dir is None or not (decomp_dir / "Terraria" / "NetMessage.cs").exists():
         raise RuntimeError(
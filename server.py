@@ -1,23 +1,49 @@
+import selectors
 import socket
 
-from main import recv_message, send
+from main import PacketStream, send
+
+
+def handle(conn, stream: PacketStream):
+    # iter_messages hands out a bounded batch; keep going until the buffer
+    # holds no complete frame, or leftovers would wait for the next recv
+    while True:
+        handled = False
+        for msg in stream.iter_messages():
+            handled = True
+            print(f"Received: {msg}")
+            if msg.type == 0x01:
+                send(conn, 0x03, {"player_slot": 0, "some_bool": 0})
+            if msg.type == 0x06:
+                send(conn, 0x52, {"module_id": 0, "module_payload": bytes(2)})
+        if not handled:
+            return
 
 
 def main():
+    # one thread, many clients: each connection keeps its own PacketStream and
+    # is only read when the selector reports it readable
+    sel = selectors.DefaultSelector()
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         s.bind(("0.0.0.0", 7779))
         s.listen()
+        sel.register(s, selectors.EVENT_READ)
         while True:
-            conn, addr = s.accept()
-            with conn:
-                print(f"Connected by {addr}")
-                while True:
-                    msg = recv_message(conn)
-                    print(f"Received: {msg}")
-                    if msg.type == 0x01:
-                        send(conn, 0x03, {"player_slot": 0})
-                    if msg.type == 0x06:
-                        send(conn, 82, {"network_something": [0, 0, 0, 0]})
+            for key, _ in sel.select():
+                if key.fileobj is s:
+                    conn, addr = s.accept()
+                    print(f"Connected by {addr}")
+                    sel.register(conn, selectors.EVENT_READ, (PacketStream(conn), addr))
+                    continue
+                conn = key.fileobj
+                stream, addr = key.data
+                try:
+                    handle(conn, stream)
+                except OSError:  # ConnectionError included
+                    print(f"Disconnected {addr}")
+                    sel.unregister(conn)
+                    conn.close()
 
 
 if __name__ == "__main__":
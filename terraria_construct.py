@@ -17,8 +17,12 @@ Applications using these constructs should interpret those bytes according to th
 protocol specification.
 """
 
+import logging
+import struct
+from dataclasses import dataclass, field, make_dataclass
+
 from construct import (
-    Computed,
+    Container,
     Enum,
     If,
     Int16ul,
@@ -33,22 +37,53 @@ from construct import (
     Int16sl,
     Int32sl,
     Float32l,
-    Array,
     GreedyBytes,
     Switch,
     FixedSized,
+    FormatField,
+    Renamed,
+    this,
+    Construct,
+    ListContainer,
+    Prefixed,
+    Bytes,
 )
+from construct.core import stream_read, stream_write
+
+_log = logging.getLogger(__name__)
 
 # -------------------------------------------------------------------------------
 # Basic helper structures
 # -------------------------------------------------------------------------------
 
+_RGB = struct.Struct("<BBB")
+
+
+class _RGBColor(Construct):
+    # r/g/b in one 3-byte unpack instead of three Byte subcons; still parses to
+    # Container(r, g, b) and builds from any mapping with those keys
+    def _parse(self, stream, context, path):
+        r, g, b = _RGB.unpack(stream_read(stream, 3, path))
+        return Container(r=r, g=g, b=b)
+
+    def _build(self, obj, stream, context, path):
+        stream_write(stream, _RGB.pack(obj["r"], obj["g"], obj["b"]), 3, path)
+        return obj
+
+    def _sizeof(self, context, path):
+        return 3
+
+    def _emitparse(self, code):
+        code.append("rgbcolor = struct.Struct('<BBB')")
+        return "Container(zip(('r', 'g', 'b'), rgbcolor.unpack(io.read(3))))"
+
+    def _emitbuild(self, code):
+        code.append("rgbcolor = struct.Struct('<BBB')")
+        return "(io.write(rgbcolor.pack(obj['r'], obj['g'], obj['b'])), obj)[1]"
+
+
 # A 24‑bit RGB colour used throughout the protocol【588973514146224†L78-L96】.
-Color = Struct(
-    "r" / Byte,
-    "g" / Byte,
-    "b" / Byte,
-)
+Color = _RGBColor()
 
 # A buff applied to an NPC (message $36)【588973514146224†L1130-L1145】.
 NPCBuff = Struct(
@@ -56,6 +91,38 @@ NPCBuff = Struct(
     "buff_time" / Int16sl,
 )
 
+
+class ScalarArray(Construct):
+    # Array(count, <FormatField>) read/written with one struct call instead of
+    # count subcon calls; also emits that single call when the spec is compiled
+    def __init__(self, count, subcon):
+        super().__init__()
+        self.count = count
+        self.fmtstr = f"<{count}{subcon.fmtstr[1:]}"
+        self._struct = struct.Struct(self.fmtstr)
+
+    def _parse(self, stream, context, path):
+        data = stream_read(stream, self._struct.size, path)
+        return ListContainer(self._struct.unpack(data))
+
+    def _build(self, obj, stream, context, path):
+        stream_write(stream, self._struct.pack(*obj), self._struct.size, path)
+        return obj
+
+    def _sizeof(self, context, path):
+        return self._struct.size
+
+    def _emitparse(self, code):
+        fname = f"scalararray_{code.allocateId()}"
+        code.append(f"{fname} = struct.Struct({self.fmtstr!r})")
+        return f"ListContainer({fname}.unpack(io.read({self._struct.size})))"
+
+    def _emitbuild(self, code):
+        fname = f"scalararray_{code.allocateId()}"
+        code.append(f"{fname} = struct.Struct({self.fmtstr!r})")
+        return f"(io.write({fname}.pack(*obj)), obj)[1]"
+
+
 NetworkTextMode = Enum(Byte, Literal=0, Formattable=1, LocalizationKey=2)
 
 NetworkText = Struct(
@@ -63,6 +130,7 @@ NetworkText = Struct(
     "text" / PascalString(lengthfield=Byte, encoding="ascii"),
     "substitutions"
     / If(
+        # stays a lambda: compiled `this` expressions emit string constants unquoted
         lambda this: this.mode != "Literal",
         PrefixedArray(
             Byte, LazyBound(lambda: NetworkText)
@@ -132,7 +200,7 @@ payload_structs = {
         "world_id" / Int32sl,
         "world_name" / PascalString(lengthfield=Byte, encoding="ascii"),
         "game_mode" / Byte,
-        "world_unique_id" / Array(16, Byte),
+        "world_unique_id" / ScalarArray(16, Byte),
         "world_generator_version" / Int64ul,
         "moon_type" / Byte,
         "forest_background" / Byte,
@@ -153,10 +221,10 @@ payload_structs = {
         "hell_back_style" / Byte,
         "wind_speed_target" / Float32l,
         "num_clouds" / Byte,
-        "tree_x" / Array(3, Int32sl),
-        "tree_style" / Array(4, Byte),
-        "cave_back_x" / Array(3, Int32sl),
-        "cave_back_style" / Array(4, Byte),
+        "tree_x" / ScalarArray(3, Int32sl),
+        "tree_style" / ScalarArray(4, Byte),
+        "cave_back_x" / ScalarArray(3, Int32sl),
+        "cave_back_style" / ScalarArray(4, Byte),
         "forst_tree_tops" / Byte,
         "forst2_tree_tops" / Byte,
         "forst3_tree_tops" / Byte,
@@ -236,12 +304,12 @@ payload_structs = {
         "position_y" / Float32l,
         "velocity"
         / If(
-            lambda this: (this.flags2 & 0b00000100) != 0,
+            (this.flags2 & 0b00000100) != 0,
             Struct("x" / Float32l, "y" / Float32l),
         ),
         "potion_return"
         / If(
-            lambda this: (this.flags3 & 0b01000000) != 0,
+            (this.flags3 & 0b01000000) != 0,
             Struct(
                 "orig_x" / Float32l,
                 "orig_y" / Float32l,
@@ -315,21 +383,20 @@ payload_structs = {
         "target" / Int16sl,
         "flags1" / Byte,
         "flags2" / Byte,
-        "ai0" / If(lambda this: this.flags1 & 0x04, Float32l),
-        "ai1" / If(lambda this: this.flags1 & 0x08, Float32l),
-        "ai2" / If(lambda this: this.flags1 & 0x10, Float32l),
-        "ai3" / If(lambda this: this.flags1 & 0x20, Float32l),
-        "ai" / Computed(lambda this: [this.ai0, this.ai1, this.ai2, this.ai3]),
+        "ai0" / If(this.flags1 & 0x04, Float32l),
+        "ai1" / If(this.flags1 & 0x08, Float32l),
+        "ai2" / If(this.flags1 & 0x10, Float32l),
+        "ai3" / If(this.flags1 & 0x20, Float32l),
         "npc_id" / Int16sl,
         "player_count_for_multiplayer_difficulty_override" / Optional(Byte),
         "strength_multiplier" / Optional(Float32l),
         "life_bytes" / Optional(Byte),
-        "life_byte" / If(lambda this: this.life_bytes == 1 and this.flags1 & 128, Byte),
-        "life_int16"
-        / If(lambda this: this.life_bytes == 2 and this.flags1 & 128, Int16ul),
-        "life_int32"
-        / If(lambda this: this.life_bytes == 4 and this.flags1 & 128, Int32sl),
-        # "life" / Computed(lambda this: this.life_byte if this.life_bytes == 1 else (this.life_int16 if this.life_bytes == 2 else this.life_int32)),
+        # life is sent at the width named by life_bytes (1/2/4) when flags1 bit 7 is set
+        "life"
+        / If(
+            this.flags1 & 128,
+            Switch(this.life_bytes, {1: Byte, 2: Int16ul, 4: Int32sl}),
+        ),
         "release_owner" / Optional(Byte),
     ),
     # $18 — Strike NPC【588973514146224†L561-L574】
@@ -572,7 +639,7 @@ payload_structs = {
         "module_payload" / GreedyBytes,
     ),
     0x93: Struct(
-        "loadout" / Array(4, Byte),
+        "loadout" / ScalarArray(4, Byte),
     ),
     # $97 — Sync Item Despawn
     0x97: Struct(
@@ -580,10 +647,340 @@ payload_structs = {
     ),
 }
 
+
+# construct's compiled code reads these with a bare io.read(n): a truncated
+# payload comes back short instead of raising StreamError, so specs that contain
+# one stay interpreted. LazyBound (recursive NetworkText) cannot be emitted.
+_UNCHECKED_READS = (Prefixed, Bytes, FixedSized, LazyBound)
+
+
+def _has_unchecked_read(sc, seen=None):
+    if seen is None:
+        seen = set()
+    if id(sc) in seen:
+        return False
+    seen.add(id(sc))
+    if isinstance(sc, _UNCHECKED_READS):
+        return True
+    children = list(getattr(sc, "subcons", ()))
+    children += [getattr(sc, a, None) for a in ("subcon", "thensubcon", "elsesubcon")]
+    children += list(getattr(sc, "cases", {}).values())
+    children.append(getattr(sc, "default", None))
+    return any(
+        isinstance(c, Construct) and _has_unchecked_read(c, seen) for c in children
+    )
+
+
+def _compiled(msg_type, st):
+    # construct's code generator turns a Struct into one straight-line parse
+    # function instead of walking the field tree on every call
+    if _has_unchecked_read(st):
+        _log.info(
+            "payload 0x%02X stays interpreted (unchecked read or LazyBound)", msg_type
+        )
+        return st
+    try:
+        return st.compile()
+    except (NotImplementedError, SyntaxError) as e:
+        _log.warning("payload 0x%02X failed to compile, interpreted: %s", msg_type, e)
+        return st
+
+
+# the declarative specs as written, for debugging / introspection
+_payload_structs_src = payload_structs
+payload_structs = {
+    msg_type: _compiled(msg_type, st) for msg_type, st in _payload_structs_src.items()
+}
+
+# -------------------------------------------------------------------------------
+# Hand-written fast paths for the hottest messages
+# -------------------------------------------------------------------------------
+
+# construct walks every field through several Python frames; for the few messages
+# that dominate live traffic a precompiled struct.Struct does the same work in one
+# C call. Each parser takes the raw payload and returns (Container, bytes consumed),
+# producing the same Container that payload_structs[msg_type].parse() would.
+
+
+def _fixed_parser(msg_type, fmt, names, extra=()):
+    # fixed-layout payloads come back as a slotted record instead of a Container
+    # (a dict filled key by key); `extra` adds fields the client fills in later
+    st = struct.Struct(fmt)
+    size = st.size
+    unpack_from = st.unpack_from
+    record = make_dataclass(
+        f"Msg{msg_type:02X}",
+        [*names, *((name, object, field(default=None)) for name in extra)],
+        slots=True,
+    )
+
+    def parse(payload):
+        return record(*unpack_from(payload)), size
+
+    return parse
+
+
+def _parse_greedy(payload):
+    return bytes(payload), len(payload)
+
+
+# $0D / $17 are most of live traffic; like the fixed-layout records they come
+# back as slotted dataclasses rather than Containers. Not pooled: WorldState
+# keeps $17 records as the NPC's current state.
+@dataclass(slots=True)
+class PlayerControl:
+    player_slot: int
+    flags1: int
+    flags2: int
+    flags3: int
+    flags4: int
+    selected_item: int
+    position_x: float
+    position_y: float
+    velocity: object = None  # Container(x, y) when flags2 bit 2
+    potion_return: object = None  # Container(orig_x, orig_y, home_x, home_y)
+
+
+@dataclass(slots=True)
+class NPCUpdate:
+    npc_slot: int
+    position_x: float
+    position_y: float
+    velocity_x: float
+    velocity_y: float
+    target: int
+    flags1: int
+    flags2: int
+    ai0: object
+    ai1: object
+    ai2: object
+    ai3: object
+    npc_id: int
+    player_count_for_multiplayer_difficulty_override: object
+    strength_multiplier: object
+    life_bytes: object
+    life: object
+    release_owner: object
+
+
+_PLAYER_CONTROL = struct.Struct("<BBBBBBff")
+_VECTOR2 = struct.Struct("<ff")
+_POTION_RETURN = struct.Struct("<ffff")
+
+
+def _parse_player_control(payload):
+    slot, flags1, flags2, flags3, flags4, selected, pos_x, pos_y = (
+        _PLAYER_CONTROL.unpack_from(payload)
+    )
+    pos = _PLAYER_CONTROL.size
+    velocity = None
+    if flags2 & 0b00000100:
+        vel_x, vel_y = _VECTOR2.unpack_from(payload, pos)
+        pos += _VECTOR2.size
+        velocity = Container(x=vel_x, y=vel_y)
+    potion_return = None
+    if flags3 & 0b01000000:
+        orig_x, orig_y, home_x, home_y = _POTION_RETURN.unpack_from(payload, pos)
+        pos += _POTION_RETURN.size
+        potion_return = Container(
+            orig_x=orig_x, orig_y=orig_y, home_x=home_x, home_y=home_y
+        )
+    return (
+        PlayerControl(
+            player_slot=slot,
+            flags1=flags1,
+            flags2=flags2,
+            flags3=flags3,
+            flags4=flags4,
+            selected_item=selected,
+            position_x=pos_x,
+            position_y=pos_y,
+            velocity=velocity,
+            potion_return=potion_return,
+        ),
+        pos,
+    )
+
+
+_NPC_UPDATE = struct.Struct("<hffffhBB")
+_FLOAT32 = struct.Struct("<f")
+_INT16S = struct.Struct("<h")
+_NPC_LIFE = {1: struct.Struct("<B"), 2: struct.Struct("<H"), 4: struct.Struct("<i")}
+
+
+def _parse_npc_update(payload):
+    # one pass over $17 instead of construct's If lambdas / Optional backtracking;
+    # trailing optional fields are None once the payload runs out
+    slot, pos_x, pos_y, vel_x, vel_y, target, flags1, flags2 = _NPC_UPDATE.unpack_from(
+        payload
+    )
+    pos = _NPC_UPDATE.size
+    ai0 = ai1 = ai2 = ai3 = None
+    if flags1 & 0x04:
+        (ai0,) = _FLOAT32.unpack_from(payload, pos)
+        pos += 4
+    if flags1 & 0x08:
+        (ai1,) = _FLOAT32.unpack_from(payload, pos)
+        pos += 4
+    if flags1 & 0x10:
+        (ai2,) = _FLOAT32.unpack_from(payload, pos)
+        pos += 4
+    if flags1 & 0x20:
+        (ai3,) = _FLOAT32.unpack_from(payload, pos)
+        pos += 4
+    (npc_id,) = _INT16S.unpack_from(payload, pos)
+    pos += 2
+    n = len(payload)
+    player_count = strength = life_bytes = life = release_owner = None
+    if pos < n:
+        player_count = payload[pos]
+        pos += 1
+    if pos + 4 <= n:
+        (strength,) = _FLOAT32.unpack_from(payload, pos)
+        pos += 4
+    if pos < n:
+        life_bytes = payload[pos]
+        pos += 1
+    if flags1 & 128 and life_bytes in _NPC_LIFE:
+        life_struct = _NPC_LIFE[life_bytes]
+        (life,) = life_struct.unpack_from(payload, pos)
+        pos += life_struct.size
+    if pos < n:
+        release_owner = payload[pos]
+        pos += 1
+    return (
+        NPCUpdate(
+            npc_slot=slot,
+            position_x=pos_x,
+            position_y=pos_y,
+            velocity_x=vel_x,
+            velocity_y=vel_y,
+            target=target,
+            flags1=flags1,
+            flags2=flags2,
+            ai0=ai0,
+            ai1=ai1,
+            ai2=ai2,
+            ai3=ai3,
+            npc_id=npc_id,
+            player_count_for_multiplayer_difficulty_override=player_count,
+            strength_multiplier=strength,
+            life_bytes=life_bytes,
+            life=life,
+            release_owner=release_owner,
+        ),
+        pos,
+    )
+
+
+_TILE_BLOCK_HEADER = struct.Struct("<hii")
+
+
+def _parse_tile_block(payload):
+    length, tile_x, tile_y = _TILE_BLOCK_HEADER.unpack_from(payload)
+    tile_data = bytes(payload[_TILE_BLOCK_HEADER.size :])
+    return (
+        Container(length=length, tile_x=tile_x, tile_y=tile_y, tile_data=tile_data),
+        len(payload),
+    )
+
+
+_NET_MODULE_HEADER = struct.Struct("<H")
+
+
+def _parse_net_module(payload):
+    (module_id,) = _NET_MODULE_HEADER.unpack_from(payload)
+    module_payload = bytes(payload[_NET_MODULE_HEADER.size :])
+    return Container(module_id=module_id, module_payload=module_payload), len(payload)
+
+
+fast_payload_parsers = {
+    0x05: _fixed_parser(
+        0x05,
+        "<BhhBh",
+        ("player_slot", "inventory_slot", "stack", "prefix_id", "item_id"),
+    ),
+    0x0A: _parse_greedy,
+    0x0D: _parse_player_control,
+    0x10: _fixed_parser(0x10, "<Bhh", ("player_slot", "current_health", "max_health")),
+    0x14: _parse_tile_block,
+    0x15: _fixed_parser(
+        0x15,
+        "<hffffhBBh",
+        (
+            "item_slot",
+            "position_x",
+            "position_y",
+            "velocity_x",
+            "velocity_y",
+            "stack",
+            "prefix_id",
+            "own_ignore",
+            "item_id",
+        ),
+        extra=("owner",),  # set from $16
+    ),
+    0x16: _fixed_parser(0x16, "<hB", ("item_slot", "owner")),
+    0x17: _parse_npc_update,
+    0x1B: _parse_greedy,
+    0x2A: _fixed_parser(0x2A, "<Bhh", ("player_slot", "mana", "max_mana")),
+    0x52: _parse_net_module,
+    0x97: _fixed_parser(0x97, "<h", ("item_slot",)),
+}
+
+
+def _derive_fixed_parser(msg_type, st):
+    # a Struct made only of named primitive fields has every field at a fixed
+    # offset: fold their formats into one struct.Struct so the whole payload is
+    # a single unpack_from. Anything nested/conditional/variable returns None.
+    subcons = getattr(st, "subcons", None)
+    if not subcons:
+        return None
+    names, fmt = [], "<"
+    for sc in subcons:
+        if not isinstance(sc, Renamed) or type(sc.subcon) is not FormatField:
+            return None
+        names.append(sc.name)
+        fmt += sc.subcon.fmtstr[1:]
+    return _fixed_parser(msg_type, fmt, tuple(names))
+
+
+for _msg_type, _st in _payload_structs_src.items():
+    if _msg_type not in fast_payload_parsers:
+        fast_payload_parsers[_msg_type] = _derive_fixed_parser(_msg_type, _st)
+        if fast_payload_parsers[_msg_type] is None:
+            del fast_payload_parsers[_msg_type]
+del _msg_type, _st
+
+
+def _payload_parser_table() -> list:
+    # msg_type -> payload parser, indexed directly by the type byte; the
+    # struct-based fast paths replace construct where they exist
+    table = [GreedyBytes.parse] * 256
+    for msg_type, st in payload_structs.items():
+        table[msg_type] = st.parse
+    for msg_type, fast in fast_payload_parsers.items():
+        table[msg_type] = lambda payload, fast=fast: fast(payload)[0]
+    return table
+
+
+payload_parsers = _payload_parser_table()
+
+_MESSAGE_HEADER = struct.Struct("<HB")
+
+
+def parse_message(buf) -> tuple[int, object]:
+    # (msg_type, payload) for one complete packet: a list index and one slice
+    # instead of TerrariaMessage's Switch/FixedSized lambdas and outer Container
+    length, msg_type = _MESSAGE_HEADER.unpack_from(buf)
+    return msg_type, payload_parsers[msg_type](buf[3:length])
+
+
 # -------------------------------------------------------------------------------
 # General packet structure
 # -------------------------------------------------------------------------------
 
+
 # Parses a complete Terraria message consisting of a 2‑byte length, 1‑byte message
 # type and a payload. The length includes the 2‑byte prefix itself (2 + 1 + payload).
 # FixedSized ensures that the payload parser consumes exactly (length - 3) bytes.
@@ -592,14 +989,20 @@ TerrariaMessage = Struct(
     "type" / Byte,
     "payload"
     / FixedSized(
-        lambda this: this.length - 3,
-        Switch(lambda this: this.type, payload_structs, default=GreedyBytes),
+        this.length - 3,
+        Switch(this.type, payload_structs, default=GreedyBytes),
     ),
 )
 
 __all__ = [
     "Color",
     "NPCBuff",
+    "NPCUpdate",
+    "PlayerControl",
+    "ScalarArray",
     "payload_structs",
+    "fast_payload_parsers",
+    "payload_parsers",
+    "parse_message",
     "TerrariaMessage",
 ]